@@ -0,0 +1,106 @@
+#!/usr/bin/python
+""" end-to-end benchmark running O2mobile/O2dsl against the local stand-in portal
+
+    usage: python bench/e2e_bench.py [--accounts N] [--concurrency N] [--latency SECONDS] [--popups LIST] [--dsl] [--browser firefox|chrome]
+"""
+
+from __future__ import print_function
+import os
+import sys
+import time
+import argparse
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from o2_scrap import O2mobile, O2dsl # pylint: disable=C0413
+from portal_server import start_server # pylint: disable=C0413
+
+class PhaseTimer(object):
+    """ collects durations per phase """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.phases = {}
+
+    def measure(self, phase, function, *args):
+        """ run a function and record its duration """
+        start = time.time()
+        try:
+            return function(*args)
+        finally:
+            with self.lock:
+                self.phases.setdefault(phase, []).append(time.time() - start)
+
+    def report(self):
+        """ print min/avg/max per phase """
+        print('{0:<12} {1:>6} {2:>9} {3:>9} {4:>9}'.format('phase', 'count', 'min s', 'avg s', 'max s'))
+        for (phase, values) in sorted(self.phases.items()):
+            print('{0:<12} {1:>6} {2:>9.3f} {3:>9.3f} {4:>9.3f}'.format(phase, len(values), min(values), sum(values) / len(values), max(values)))
+
+def run_mobile(url, account, timer, args):
+    """ full mobile session: login, numbers, overview, bills, logout """
+    o2m = O2mobile('user{0}'.format(account), args.password, browser=args.browser, base_url=url, login_url=url + '/auth/login')
+    timer.measure('login', o2m.__enter__)
+    try:
+        numbers = timer.measure('numbers', o2m.get_numbers)
+        for number in sorted(numbers)[:args.numbers]:
+            timer.measure('overview', o2m.get_overview, number)
+        timer.measure('bills', o2m.get_bills)
+    finally:
+        timer.measure('logout', o2m.__exit__)
+
+def run_dsl(url, account, timer, args):
+    """ full dsl session: login, overview, logout """
+    o2d = O2dsl('user{0}'.format(account), args.password, base_url=url + '/dsl/')
+    timer.measure('login', o2d.__enter__)
+    try:
+        timer.measure('overview', o2d.get_overview)
+    finally:
+        timer.measure('logout', o2d.__exit__)
+
+def main():
+    """ main function """
+    aparser = argparse.ArgumentParser(description='o2_scrap end-to-end benchmark')
+    aparser.add_argument('--accounts', type=int, default=4, help='number of accounts to process')
+    aparser.add_argument('--concurrency', type=int, default=1, help='accounts processed in parallel')
+    aparser.add_argument('--numbers', type=int, default=1, help='numbers queried per mobile account')
+    aparser.add_argument('--latency', type=float, default=0.05, help='delay in seconds added to every response')
+    aparser.add_argument('--popups', default='cookie,optin,modal,ads', help='comma separated list of popups to show')
+    aparser.add_argument('--password', default='secret')
+    aparser.add_argument('--browser', default='firefox')
+    aparser.add_argument('--dsl', action='store_true', help='benchmark dsl instead of mobile accounts')
+    args = aparser.parse_args()
+
+    (server, url) = start_server(latency=args.latency, popups=[popup for popup in args.popups.split(',') if popup], password=args.password)
+    timer = PhaseTimer()
+    accounts = list(range(args.accounts))
+    lock = threading.Lock()
+    failed = []
+
+    def worker():
+        """ process accounts until the list is empty """
+        while True:
+            with lock:
+                if not accounts:
+                    return
+                account = accounts.pop(0)
+            try:
+                timer.measure('session', run_dsl if args.dsl else run_mobile, url, account, timer, args)
+            except BaseException as err: # pylint: disable=W0703
+                print('account {0} failed: {1}'.format(account, err))
+                failed.append(account)
+
+    start = time.time()
+    threads = [threading.Thread(target=worker) for _cnt in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.time() - start
+    server.shutdown()
+
+    timer.report()
+    print('wall time: {0:.2f}s, throughput: {1:.2f} accounts/s, failed: {2}, portal requests: {3}'.format(wall, args.accounts / wall, len(failed), server.RequestHandlerClass.state.requests))
+
+if __name__ == '__main__':
+    main()
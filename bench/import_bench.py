@@ -0,0 +1,67 @@
+#!/usr/bin/python
+""" benchmark of the import time of o2_scrap in fresh interpreters
+
+    usage: python bench/import_bench.py [-n RUNS] [--module NAME] [--allow MODULE ...] [--budget MS]
+"""
+
+from __future__ import print_function
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# dependencies which must not be loaded by a plain import
+HEAVY = ('selenium', 'bs4', 'requests', 'lxml', 'asyncio')
+
+PROBE = """
+import sys, time, json
+start = time.perf_counter()
+import {0}
+elapsed = (time.perf_counter() - start) * 1000
+print(json.dumps({{'ms': elapsed, 'modules': sorted(name for name in {1!r} if name in sys.modules)}}))
+"""
+
+def measure(module):
+    """ import a module in a fresh interpreter
+
+        returns:
+            dictionary (ms, modules)
+    """
+    env = dict(os.environ)
+    env['PYTHONPATH'] = ROOT + os.pathsep + env.get('PYTHONPATH', '')
+    output = subprocess.check_output([sys.executable, '-c', PROBE.format(module, HEAVY)], env=env)
+    return json.loads(output.decode('utf-8').strip().splitlines()[-1])
+
+def main():
+    """ main function """
+    aparser = argparse.ArgumentParser(description='o2_scrap import time benchmark')
+    aparser.add_argument('-n', '--runs', type=int, default=20, help='number of interpreter starts')
+    aparser.add_argument('--module', default='o2_scrap', help='module to import')
+    aparser.add_argument('--allow', nargs='*', default=[], help='heavy modules expected to be loaded by the import')
+    aparser.add_argument('--budget', type=float, help='fail if the median import time exceeds this value (ms)')
+    args = aparser.parse_args()
+
+    timings = []
+    loaded = []
+    for _cnt in range(args.runs):
+        result = measure(args.module)
+        timings.append(result['ms'])
+        loaded = [name for name in result['modules'] if name not in args.allow]
+    timings.sort()
+    median = timings[len(timings) // 2]
+    print('import {0}: median {1:.1f}ms, min {2:.1f}ms, max {3:.1f}ms ({4} runs)'.format(args.module, median, timings[0], timings[-1], args.runs))
+
+    failed = False
+    if loaded:
+        print('heavy modules loaded at import: {0}'.format(', '.join(loaded)))
+        failed = True
+    if args.budget and median > args.budget:
+        print('import time exceeds budget of {0:.1f}ms'.format(args.budget))
+        failed = True
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
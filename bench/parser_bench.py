@@ -0,0 +1,134 @@
+#!/usr/bin/python
+""" benchmark of the html parser backends against the offline fixture corpus
+
+    usage: python bench/parser_bench.py [-n ITERATIONS] [--json FILE] [--baseline FILE] [--threshold FACTOR]
+"""
+
+from __future__ import print_function
+import os
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from o2_scrap.parser import PARSERS # pylint: disable=C0413
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+# extractor -> (fixture file, additional arguments)
+EXTRACTORS = {
+    'bills': ('bills.html', ('https://www.o2online.de',)),
+    'data_usage': ('usage_monitor.html', ()),
+    'dsl_overview': ('dsl_usage.html', ()),
+    'navigation': ('navigation.html', ()),
+    'numbers': ('contract_choice.html', ()),
+    'tariff_contract': ('tariff_details.html', ()),
+    'tariff_sim': ('tarifinfo.html', ()),
+}
+
+# expected result per extractor (both backends have to return it)
+EXPECTED_FILE = os.path.join(FIXTURE_DIR, 'expected.json')
+
+def load_fixture(name):
+    """ read a fixture file """
+    with open(os.path.join(FIXTURE_DIR, name), 'r') as fh_:
+        return fh_.read()
+
+def measure(function, args, iterations):
+    """ measure latency and peak memory of a parser call
+
+        returns:
+            tuple (result, average latency in ms, peak memory in KiB)
+    """
+    result = function(*args)
+    start = time.perf_counter()
+    for _cnt in range(iterations):
+        function(*args)
+    latency = (time.perf_counter() - start) * 1000 / iterations
+
+    tracemalloc.start()
+    function(*args)
+    (_current, peak) = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return (result, latency, peak / 1024.0)
+
+def load_expected():
+    """ read the expected results of all extractors """
+    with open(EXPECTED_FILE, 'r') as fh_:
+        return json.load(fh_)
+
+def run(iterations, expected=None):
+    """ run all extractors with all backends
+
+        args:
+            iterations - iterations per extractor and backend
+            expected   - expected result per extractor (default: load_expected())
+
+        returns:
+            tuple (dictionary "<extractor>:<backend>" -> {latency_ms, peak_kib}, list of "<extractor>:<backend>" with unexpected results)
+    """
+    if expected is None:
+        expected = load_expected()
+    report = {}
+    mismatches = []
+    for extractor in sorted(EXTRACTORS):
+        (fixture, extra_args) = EXTRACTORS[extractor]
+        args = (load_fixture(fixture),) + extra_args
+        for backend in sorted(PARSERS):
+            key = '{0}:{1}'.format(extractor, backend)
+            (result, latency, peak) = measure(getattr(PARSERS[backend](), extractor), args, iterations)
+            report[key] = {'latency_ms': round(latency, 4), 'peak_kib': round(peak, 1)}
+            # compare the json representation: tuples and lists are the same
+            if extractor not in expected or json.loads(json.dumps(result)) != expected[extractor]:
+                mismatches.append(key)
+    return (report, mismatches)
+
+def compare(report, baseline, threshold):
+    """ compare latencies against a baseline report
+
+        returns:
+            list of regressions
+    """
+    regressions = []
+    for (key, values) in sorted(report.items()):
+        if key in baseline and values['latency_ms'] > baseline[key]['latency_ms'] * threshold:
+            regressions.append('{0}: {1:.3f}ms (baseline {2:.3f}ms)'.format(key, values['latency_ms'], baseline[key]['latency_ms']))
+    return regressions
+
+def main():
+    """ main function """
+    aparser = argparse.ArgumentParser(description='o2_scrap parser benchmark')
+    aparser.add_argument('-n', '--iterations', type=int, default=200, help='iterations per extractor and backend')
+    aparser.add_argument('--json', help='write report to file')
+    aparser.add_argument('--baseline', help='report to compare latencies with')
+    aparser.add_argument('--threshold', type=float, default=1.25, help='allowed slowdown factor compared to the baseline')
+    args = aparser.parse_args()
+
+    (report, mismatches) = run(args.iterations)
+
+    print('{0:<24} {1:>12} {2:>12}'.format('extractor:backend', 'latency ms', 'peak KiB'))
+    for (key, values) in sorted(report.items()):
+        print('{0:<24} {1:>12.3f} {2:>12.1f}'.format(key, values['latency_ms'], values['peak_kib']))
+
+    if args.json:
+        with open(args.json, 'w') as fh_:
+            json.dump(report, fh_, indent=4, sort_keys=True)
+
+    failed = False
+    for key in mismatches:
+        print('unexpected result of {0} (see {1})'.format(key, os.path.basename(EXPECTED_FILE)))
+        failed = True
+
+    if args.baseline:
+        with open(args.baseline, 'r') as fh_:
+            regressions = compare(report, json.load(fh_), args.threshold)
+        for regression in regressions:
+            print('regression: {0}'.format(regression))
+            failed = True
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
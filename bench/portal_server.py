@@ -0,0 +1,322 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+""" local stand-in for the o2online mobile and dsl portals
+
+    usage: python bench/portal_server.py [--port PORT] [--latency SECONDS] [--popups cookie,optin,modal,ads] [--password PASSWORD]
+
+    mobile: O2mobile(user, pwd, base_url='http://127.0.0.1:<port>', login_url='http://127.0.0.1:<port>/auth/login')
+    dsl:    O2dsl(user, pwd, base_url='http://127.0.0.1:<port>/dsl/')
+"""
+
+from __future__ import print_function
+import os
+import json
+import time
+import uuid
+import argparse
+import threading
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import urlparse, parse_qs
+    from http.cookies import SimpleCookie
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urlparse import urlparse, parse_qs
+    from Cookie import SimpleCookie
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+DSL_USAGE_PATH = '/dsl/selfcare/content/segment/kundencenter/meindslfestnetz/dslverbrauch/'
+
+# phone numbers of the contract -> (tariff, data usage)
+NUMBERS = {
+    '0176-00000001': ('O2 Free M', '1,22'),
+    '0176-00000002': ('O2 Blue Data S', '0,35'),
+    '0176-00000003': ('O2 Blue Basic', '4,80'),
+    '0176-00000004': ('O2 Blue All-in L (2015)', '7,01'),
+    '0179-00000005': ('O2 Blue All-in S (2015)', '0,02'),
+}
+
+PAGE = u"""<!DOCTYPE html>
+<html lang="de">
+<head><meta charset="utf-8"><title>{title}</title></head>
+<body>
+{popups}
+{content}
+</body>
+</html>
+"""
+
+COOKIE_BANNER = u"""<div id="uc-banner"><p>Wir verwenden Cookies.</p>
+<button id="uc-btn-accept-banner" onclick="document.getElementById('uc-banner').style.display='none'">Akzeptieren</button></div>"""
+
+OPTIN = u"""<div id="optin"><p>Einwilligung</p>
+<button id="optinAcceptButton" onclick="document.getElementById('optin').style.display='none'">Zustimmen</button></div>"""
+
+MODAL = u"""<div class="modal-content" id="modal"><div class="modal-header">
+<button data-tracking-description="cms___close" onclick="document.getElementById('modal').style.display='none'">x</button></div>
+<div class="modal-body">Werbung per E-Mail?</div></div>"""
+
+ADS = u"""<div id="ads"><button data-tracking-description="cms___Schließen" onclick="document.getElementById('ads').style.display='none'">Schließen</button></div>"""
+
+LOGIN_FORM = u"""{error}<form method="post" action="/auth/login">
+<input id="IDToken1" name="IDToken1" type="text">
+<input id="IDToken2" name="IDToken2" type="password">
+<button type="submit">Einloggen</button>
+</form>"""
+
+DSL_LOGIN_FORM = u"""{error}<form method="post" action="/dsl/sso/login">
+<input id="benutzername" name="benutzername" type="text">
+<input id="passwort" name="passwort" type="password">
+<button id="loginButton" type="submit">Login</button>
+</form>"""
+
+NAVIGATION = u"""<div class="side-nav">
+<span class="navigation-label">Mein O2</span>
+<a class="side-nav-contract-choice-link" href="#" onclick="var m=document.getElementById('numbers'); m.style.display=(m.style.display=='none'?'block':'none'); return false;">{number}</a>
+<ul class="side-nav-contract-choice-menu-items" id="numbers" style="display:none">
+{numbers}
+</ul>
+<ul class="side-nav-links">
+<li><a href="/ecare/verbrauch">Verbrauch</a></li>
+<li><a href="/ecare/tarif">Tarif und Vertrag</a></li>
+<li><a href="/ecare/rechnung">Rechnung</a></li>
+<li><a href="/ecare/">Mein O2</a></li>
+<li><a href="/auth/logout">Logout</a></li>
+</ul>
+</div>"""
+
+# json endpoints the ecare pages load via xhr
+API_SCRIPT = u"""<script>fetch('{0}', {{credentials: 'same-origin'}});</script>"""
+API_VIEWS = {
+    '/ecare/': ('/ecare/api/subscriptions', '/ecare/api/usage'),
+    '/ecare/verbrauch': ('/ecare/api/usage',),
+    '/ecare/tarif': ('/ecare/api/tariff',),
+    '/ecare/rechnung': ('/ecare/api/bills',),
+}
+
+def load_fixture(name):
+    """ read a fixture file """
+    with open(os.path.join(FIXTURE_DIR, name), 'rb') as fh_:
+        return fh_.read().decode('utf-8')
+
+class PortalState(object):
+    """ configuration and sessions of the stand-in portal """
+
+    def __init__(self, latency=0.0, popups=('cookie', 'optin', 'modal', 'ads'), password='secret'):
+        self.latency = latency
+        self.popups = popups
+        self.password = password
+        self.lock = threading.Lock()
+        self.sessions = {}
+        self.requests = 0
+
+    def create_session(self, user):
+        """ create a new session and return its token """
+        token = uuid.uuid4().hex
+        with self.lock:
+            self.sessions[token] = {'user': user, 'number': sorted(NUMBERS)[0]}
+        return token
+
+    def get_session(self, token):
+        """ get session data of a token """
+        with self.lock:
+            return self.sessions.get(token)
+
+    def delete_session(self, token):
+        """ invalidate a session """
+        with self.lock:
+            self.sessions.pop(token, None)
+
+class PortalHandler(BaseHTTPRequestHandler):
+    """ request handler of the stand-in portal """
+    state = None
+
+    def log_message(self, *args): # pylint: disable=W0221
+        """ keep quiet """
+
+    def _cookie(self, name):
+        """ get cookie value from request """
+        cookie = SimpleCookie(self.headers.get('Cookie', ''))
+        return cookie[name].value if name in cookie else None
+
+    def _popups(self, *names):
+        """ html of the configured popups """
+        snippets = {'cookie': COOKIE_BANNER, 'optin': OPTIN, 'modal': MODAL, 'ads': ADS}
+        return u'\n'.join(snippets[name] for name in names if name in self.state.popups)
+
+    def _send(self, status, body=u'', headers=None):
+        """ send a response after the configured latency """
+        if self.state.latency:
+            time.sleep(self.state.latency)
+        with self.state.lock:
+            self.state.requests += 1
+        payload = body.encode('utf-8')
+        self.send_response(status)
+        for (key, value) in (headers or []):
+            self.send_header(key, value)
+        if payload and not any(key == 'Content-Type' for (key, _value) in (headers or [])):
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _send_pdf(self):
+        """ send a dummy bill document """
+        if self.state.latency:
+            time.sleep(self.state.latency)
+        payload = b'%PDF-1.4\n' + b'0' * 65536 + b'\n%%EOF\n'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/pdf')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _redirect(self, location, cookies=()):
+        """ send a redirect """
+        headers = [('Location', location)] + [('Set-Cookie', cookie) for cookie in cookies]
+        self._send(302, headers=headers)
+
+    def _form(self):
+        """ parse posted form data """
+        length = int(self.headers.get('Content-Length', 0))
+        data = parse_qs(self.rfile.read(length).decode('utf-8'))
+        return dict((key, value[0]) for (key, value) in data.items())
+
+    def _ecare(self, path, session):
+        """ render ecare pages """
+        number = session['number']
+        numbers = u'\n'.join(u'<li><a href="/ecare/switch?number={0}"><span>{1}</span> <span>{0}</span></a></li>'.format(key, NUMBERS[key][0]) for key in sorted(NUMBERS))
+        navigation = NAVIGATION.format(number=number, numbers=numbers)
+        popups = u''
+        if path in ('/ecare/', '/ecare/verbrauch'):
+            content = load_fixture('usage_monitor.html').replace(u'1,22', NUMBERS[number][1])
+            popups = self._popups('optin', 'modal', 'ads')
+        elif path == '/ecare/tarif':
+            content = u'<div class="item-collection"><a href="#">Mehr</a></div>' + load_fixture('tariff_details.html').replace(u'O2 Free M', NUMBERS[number][0])
+        elif path == '/ecare/rechnung':
+            content = load_fixture('bills.html')
+        else:
+            return self._send(404, u'not found')
+        scripts = u''.join(API_SCRIPT.format(url) for url in API_VIEWS[path])
+        return self._send(200, PAGE.format(title=u'Mein O2', popups=popups, content=navigation + content + scripts))
+
+    def _api(self, path, session):
+        """ json endpoints of the ecare app """
+        number = session['number']
+        if path == '/ecare/api/usage':
+            data = json.loads(load_fixture('api_usage.json'))
+            data['subscriptionId'] = number
+            data['consumptions'][0]['used']['value'] = int(float(NUMBERS[number][1].replace(',', '.')) * 1024 ** 3)
+        elif path == '/ecare/api/tariff':
+            data = json.loads(load_fixture('api_tariff.json'))
+            data['subscriptionId'] = number
+            data['tariff']['name'] = NUMBERS[number][0]
+        elif path == '/ecare/api/subscriptions':
+            data = json.loads(load_fixture('api_subscriptions.json'))
+        elif path == '/ecare/api/bills':
+            data = json.loads(load_fixture('api_bills.json'))
+        else:
+            return self._send(404, u'not found')
+        return self._send(200, json.dumps(data), [('Content-Type', 'application/json')])
+
+    def do_GET(self): # pylint: disable=C0103
+        """ handle get requests """
+        url = urlparse(self.path)
+        path = url.path
+        if path == '/auth/login':
+            return self._send(200, PAGE.format(title=u'Login', popups=self._popups('cookie'), content=LOGIN_FORM.format(error=u'')))
+        if path == '/auth/logout':
+            self.state.delete_session(self._cookie('session'))
+            return self._redirect('/auth/login', ['session=; Path=/; Max-Age=0'])
+        if path.startswith('/ecare'):
+            session = self.state.get_session(self._cookie('session'))
+            if not session:
+                return self._redirect('/auth/login?goto=' + path)
+            if path == '/ecare/' and 'downloadLink' in url.query:
+                return self._send_pdf()
+            if path.startswith('/ecare/api/'):
+                return self._api(path, session)
+            if path == '/ecare/switch':
+                number = parse_qs(url.query).get('number', [''])[0]
+                if number in NUMBERS:
+                    session['number'] = number
+                return self._redirect('/ecare/verbrauch')
+            return self._ecare(path, session)
+        if path == '/dsl/sso/login':
+            return self._send(200, PAGE.format(title=u'DSL Login', popups=u'', content=DSL_LOGIN_FORM.format(error=u'')))
+        if path == '/dsl/sso/logout':
+            self.state.delete_session(self._cookie('dslsession'))
+            return self._redirect('/dsl/sso/login', ['dslsession=; Path=/; Max-Age=0'])
+        if path.startswith('/dsl/selfcare'):
+            if not self.state.get_session(self._cookie('dslsession')):
+                return self._redirect('/dsl/sso/login')
+            if path == DSL_USAGE_PATH:
+                return self._send(200, load_fixture('dsl_usage.html').replace(u'/sso/logout', u'/dsl/sso/logout'))
+            return self._send(200, PAGE.format(title=u'Kundencenter', popups=u'', content=u'<a class="logoutUser" href="/dsl/sso/logout">Logout</a><div class="datablock usedvolume">66 / 300 GB</div>'))
+        if path in ('/', '/dsl/'):
+            return self._send(200, PAGE.format(title=u'o2', popups=u'', content=u''))
+        return self._send(404, u'not found')
+
+    def do_POST(self): # pylint: disable=C0103
+        """ handle post requests """
+        path = urlparse(self.path).path
+        form = self._form()
+        if path == '/auth/login':
+            if form.get('IDToken2') != self.state.password:
+                error = u'<div class="alert alert-danger">Benutzername oder Passwort falsch.</div>'
+                return self._send(200, PAGE.format(title=u'Login', popups=u'', content=LOGIN_FORM.format(error=error)))
+            token = self.state.create_session(form.get('IDToken1'))
+            return self._redirect('/ecare/', ['session={0}; Path=/'.format(token)])
+        if path == '/dsl/sso/login':
+            if form.get('passwort') != self.state.password:
+                error = u'<div class="alert">Login fehlgeschlagen.</div>'
+                return self._send(200, PAGE.format(title=u'DSL Login', popups=u'', content=DSL_LOGIN_FORM.format(error=error)))
+            token = self.state.create_session(form.get('benutzername'))
+            return self._redirect('/dsl/selfcare/', ['dslsession={0}; Path=/'.format(token)])
+        return self._send(404, u'not found')
+
+class PortalServer(ThreadingMixIn, HTTPServer):
+    """ threaded http server """
+    daemon_threads = True
+
+def start_server(port=0, latency=0.0, popups=('cookie', 'optin', 'modal', 'ads'), password='secret'):
+    """ start the stand-in portal in a background thread
+
+        args:
+            port     - port to listen on (0 - pick a free port)
+            latency  - delay in seconds added to every response
+            popups   - list of popups to show (cookie, optin, modal, ads)
+            password - password accepted for all users
+
+        returns:
+            tuple (server object, base url)
+    """
+    handler = type('Handler', (PortalHandler,), {'state': PortalState(latency, popups, password)})
+    server = PortalServer(('127.0.0.1', port), handler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return (server, 'http://127.0.0.1:{0}'.format(server.server_address[1]))
+
+def main():
+    """ main function """
+    aparser = argparse.ArgumentParser(description='o2online stand-in portal')
+    aparser.add_argument('--port', type=int, default=8080)
+    aparser.add_argument('--latency', type=float, default=0.0, help='delay in seconds added to every response')
+    aparser.add_argument('--popups', default='cookie,optin,modal,ads', help='comma separated list of popups to show')
+    aparser.add_argument('--password', default='secret', help='password accepted for all users')
+    args = aparser.parse_args()
+
+    (server, url) = start_server(args.port, args.latency, [popup for popup in args.popups.split(',') if popup], args.password)
+    print('stand-in portal running on {0}'.format(url))
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == '__main__':
+    main()
@@ -1,2 +1,25 @@
 """ __init__.py """
-from .o2_scrap import O2mobile, O2dsl
+from .o2_scrap import O2mobile, O2dsl, DriverPool, wait_config, wait_stats
+from .trace import tracer, CallbackSink, JsonLinesSink, PrometheusSink
+from .diagnostics import Diagnostics
+from .cache import MemoryCache, SqliteCache
+from .store import UsageStore
+from .models import DataUsage, PlanData, Bill, DslUsage, overview_records
+from .errors import O2Error, LoginError, PortalUnavailable, PageError, SessionClosed, CircuitOpen
+from .retry import RetryPolicy, CircuitBreaker, breaker_config
+from .profile import ProfileManager
+from .lifecycle import DriverManager, drivers, driver_config
+
+# the asyncio api is loaded on first access as importing asyncio is expensive
+_AIO = ('AsyncO2mobile', 'AsyncO2dsl', 'DriverExecutor')
+
+def __getattr__(name):
+    """ import the asyncio api on first access """
+    if name in _AIO:
+        from . import aio
+        return getattr(aio, name)
+    raise AttributeError('module {0!r} has no attribute {1!r}'.format(__name__, name))
+
+def __dir__():
+    """ include the lazily loaded names """
+    return sorted(list(globals()) + list(_AIO))
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+""" asyncio api: O2mobile and O2dsl driven from a bounded executor """
+
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from .o2_scrap import O2mobile, O2dsl, print_debug, selenium_exceptions
+from .lifecycle import drivers
+
+class DriverExecutor(object):
+    """ bounded executor running blocking driver operations
+
+        callers wait (without blocking the event loop) as soon as max_workers
+        operations are running, so there is no unbounded queue of pending work
+    """
+
+    def __init__(self, max_workers=4):
+        self.max_workers = max_workers
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.semaphores = {}
+        self.lock = threading.Lock()
+
+    def _semaphore(self):
+        """ semaphore bound to the running event loop """
+        loop = asyncio.get_event_loop()
+        with self.lock:
+            if loop not in self.semaphores:
+                self.semaphores[loop] = asyncio.Semaphore(self.max_workers)
+            return self.semaphores[loop]
+
+    async def run(self, func, *args, **kwargs):
+        """ run a blocking function in the executor """
+        async with self._semaphore():
+            return await asyncio.get_event_loop().run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+
+    def shutdown(self, wait=True):
+        """ stop the executor """
+        self.executor.shutdown(wait=wait)
+
+_DEFAULT_EXECUTOR = []
+
+def default_executor():
+    """ executor shared by all async objects not given an own executor """
+    if not _DEFAULT_EXECUTOR:
+        _DEFAULT_EXECUTOR.append(DriverExecutor())
+    return _DEFAULT_EXECUTOR[0]
+
+class _AsyncBase(object):
+    """ common handling of async wrappers """
+    sync = None
+
+    def __init__(self, executor=None):
+        self.executor = executor or default_executor()
+        # created on first use to bind it to the running event loop
+        self.lock = None
+
+    async def _run(self, func, *args, **kwargs):
+        """ run a method of the sync object; a cancelled call tears down the driver """
+        if self.lock is None:
+            self.lock = asyncio.Lock()
+        async with self.lock:
+            try:
+                return await self.executor.run(func, *args, **kwargs)
+            except asyncio.CancelledError:
+                await self._teardown()
+                raise
+
+    async def _teardown(self):
+        """ quit the driver so that a still running call in the executor fails fast """
+        # keep the call still running in the executor from recovering with a new browser
+        self.sync.cancelled = True
+        # the http engine (O2dsl) and the fastpath (O2mobile) work without a driver
+        session = getattr(self.sync, 'session', None)
+        if session:
+            self.sync.session = None
+            session.close()
+        driver = self.sync.driver
+        if not driver:
+            return
+        print_debug(self.sync.debug, '{0}._teardown()'.format(type(self).__name__))
+        self.sync.driver = None
+        # the browser of an account profile has to be gone before the profile can be used again
+        profile = getattr(self.sync, 'profile', None)
+        if profile:
+            self.sync.profile = None
+
+        def _quit():
+            drivers.quit(driver)
+            if profile:
+                self.sync.profiles.release(profile)
+
+        try:
+            await asyncio.shield(asyncio.get_event_loop().run_in_executor(None, _quit))
+        except (selenium_exceptions.WebDriverException, asyncio.CancelledError):
+            pass
+
+    async def __aenter__(self):
+        await self._run(self.sync.__enter__)
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, _traceback):
+        if exc_type is None:
+            await self._run(self.sync.logout)
+        else:
+            # do not try to logout from a broken session
+            await self._teardown()
+        return False
+
+class AsyncO2mobile(_AsyncBase):
+    """ asyncio version of O2mobile (takes the same arguments plus an optional DriverExecutor) """
+
+    def __init__(self, *args, **kwargs):
+        executor = kwargs.pop('executor', None)
+        super(AsyncO2mobile, self).__init__(executor)
+        self.sync = O2mobile(*args, **kwargs)
+
+    async def get_bills(self):
+        """ get list of bills per month """
+        return await self._run(self.sync.get_bills)
+
+    async def get_data_usage(self):
+        """ get usage data """
+        return await self._run(self.sync.get_data_usage)
+
+    async def get_numbers(self):
+        """ get phone numbers belonging to the contract """
+        return await self._run(self.sync.get_numbers)
+
+    async def get_overview(self, number):
+        """ get data consumption and contract details for a given number """
+        return await self._run(self.sync.get_overview, number)
+
+    async def overviews(self, numbers=None):
+        """ async generator yielding (number, overview) tuples
+
+            args:
+                numbers - list of phone numbers (default: all numbers returned by get_numbers())
+        """
+        if numbers is None:
+            numbers = sorted(await self.get_numbers())
+        for number in numbers:
+            yield (number, await self.get_overview(number))
+
+    async def sync_bills(self, target_dir, workers=4):
+        """ download all bills not stored in target_dir so far """
+        return await self._run(self.sync.sync_bills, target_dir, workers)
+
+    async def logout(self):
+        """ logout method """
+        return await self._run(self.sync.logout)
+
+class AsyncO2dsl(_AsyncBase):
+    """ asyncio version of O2dsl (takes the same arguments plus an optional DriverExecutor) """
+
+    def __init__(self, *args, **kwargs):
+        executor = kwargs.pop('executor', None)
+        super(AsyncO2dsl, self).__init__(executor)
+        self.sync = O2dsl(*args, **kwargs)
+
+    async def get_overview(self):
+        """ get data consumption """
+        return await self._run(self.sync.get_overview)
+
+    async def logout(self):
+        """ logout method """
+        return await self._run(self.sync.logout)
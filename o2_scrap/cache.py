@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+""" ttl result cache with per-section freshness and lru eviction """
+
+from __future__ import print_function
+import json
+import time
+import copy
+import sqlite3
+import threading
+import collections
+
+# default time-to-live per section in seconds
+DEFAULT_TTL = {
+    'usage': 300,
+    'plan-data': 86400,
+    'numbers': 86400,
+}
+
+class MemoryCache(object):
+    """ in-memory result cache """
+
+    def __init__(self, ttl=None, size=1000):
+        self.ttl = dict(DEFAULT_TTL)
+        if ttl:
+            self.ttl.update(ttl)
+        self.size = size
+        self.lock = threading.Lock()
+        self.data = collections.OrderedDict()
+
+    def get(self, account, number, section):
+        """ get a cached result
+
+            args:
+                account - account name
+                number  - phone number (None for account wide sections)
+                section - section name (usage, plan-data, numbers)
+
+            returns:
+                cached result or None in case of a miss or an expired entry
+        """
+        key = (account, number or '', section)
+        with self.lock:
+            entry = self.data.get(key)
+            if entry is None:
+                return None
+            if time.time() - entry[0] > self.ttl.get(section, 0):
+                del self.data[key]
+                return None
+            # mark as recently used
+            self.data.pop(key)
+            self.data[key] = entry
+            return copy.deepcopy(entry[1])
+
+    def set(self, account, number, section, value):
+        """ store a result """
+        key = (account, number or '', section)
+        with self.lock:
+            self.data.pop(key, None)
+            self.data[key] = (time.time(), copy.deepcopy(value))
+            while len(self.data) > self.size:
+                self.data.popitem(last=False)
+
+    def invalidate(self, account=None):
+        """ drop all entries (of an account) """
+        with self.lock:
+            if account is None:
+                self.data.clear()
+            else:
+                for key in [key for key in self.data if key[0] == account]:
+                    del self.data[key]
+
+class SqliteCache(object):
+    """ on-disk result cache using sqlite """
+
+    def __init__(self, filename, ttl=None, size=10000):
+        self.ttl = dict(DEFAULT_TTL)
+        if ttl:
+            self.ttl.update(ttl)
+        self.size = size
+        self.lock = threading.Lock()
+        self.dbh = sqlite3.connect(filename, check_same_thread=False)
+        self.dbh.execute('CREATE TABLE IF NOT EXISTS results (account TEXT, number TEXT, section TEXT, stored REAL, accessed REAL, value TEXT, PRIMARY KEY (account, number, section))')
+        self.dbh.execute('CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)')
+        self.dbh.commit()
+
+    def get(self, account, number, section):
+        """ get a cached result
+
+            args:
+                account - account name
+                number  - phone number (None for account wide sections)
+                section - section name (usage, plan-data, numbers)
+
+            returns:
+                cached result or None in case of a miss or an expired entry
+        """
+        now = time.time()
+        with self.lock:
+            row = self.dbh.execute('SELECT stored, value FROM results WHERE account=? AND number=? AND section=?', (account, number or '', section)).fetchone()
+            if row is None:
+                return None
+            if now - row[0] > self.ttl.get(section, 0):
+                self.dbh.execute('DELETE FROM results WHERE account=? AND number=? AND section=?', (account, number or '', section))
+                self.dbh.commit()
+                return None
+            self.dbh.execute('UPDATE results SET accessed=? WHERE account=? AND number=? AND section=?', (now, account, number or '', section))
+            self.dbh.commit()
+        return json.loads(row[1])
+
+    def set(self, account, number, section, value):
+        """ store a result """
+        now = time.time()
+        with self.lock:
+            self.dbh.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)', (account, number or '', section, now, now, json.dumps(value)))
+            # lru eviction
+            self.dbh.execute('DELETE FROM results WHERE rowid IN (SELECT rowid FROM results ORDER BY accessed DESC LIMIT -1 OFFSET ?)', (self.size,))
+            self.dbh.commit()
+
+    def invalidate(self, account=None):
+        """ drop all entries (of an account) """
+        with self.lock:
+            if account is None:
+                self.dbh.execute('DELETE FROM results')
+            else:
+                self.dbh.execute('DELETE FROM results WHERE account=?', (account,))
+            self.dbh.commit()
+
+    def close(self):
+        """ close the database """
+        with self.lock:
+            self.dbh.close()
@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+""" network capture: build results from the json responses the ecare app loads via xhr """
+
+from __future__ import print_function
+import re
+import json
+import time
+import base64
+from datetime import datetime
+from .trace import tracer
+
+# url patterns of the json endpoints per section
+API_PATTERNS = {
+    'usage': r'/api/.*(usage|consumption)',
+    'tariff': r'/api/.*tariff',
+    'numbers': r'/api/.*subscriptions/?(\?|$)',
+    'bills': r'/api/.*bills/?(\?|$)',
+}
+
+# sections depending on the selected phone number (dropped on navigation)
+NUMBER_SECTIONS = ('usage', 'tariff')
+
+UNIT_BYTES = {'BYTE': 1, 'KB': 1024, 'KBYTE': 1024, 'MB': 1024 ** 2, 'MBYTE': 1024 ** 2, 'GB': 1024 ** 3, 'GBYTE': 1024 ** 3}
+
+def format_bytes(value):
+    """ format a number of bytes the way the portal does ('122 MB', '1,22 GB') """
+    if value >= 1024 ** 3:
+        text = '{0:.2f}'.format(value / float(1024 ** 3)).replace('.', ',')
+        if text.endswith(',00'):
+            text = text[:-3]
+        return text + ' GB'
+    return '{0} MB'.format(int(round(value / float(1024 ** 2))))
+
+def format_money(amount):
+    """ format an amount in euro ('29,99') """
+    return '{0:.2f}'.format(amount).replace('.', ',')
+
+def format_date(value, fmt='%d.%m.%Y'):
+    """ convert an iso date into the german format used by the portal """
+    return datetime.strptime(value[:10], '%Y-%m-%d').strftime(fmt)
+
+def _volume(entry):
+    """ volume object ({'value': ..., 'unit': ...}) in bytes """
+    return int(entry['value'] * UNIT_BYTES[entry.get('unit', 'BYTE').upper()])
+
+def build_usage(data, _base_url):
+    """ data usage in the format of parser.data_usage() plus exact byte counts """
+    usage = [entry for entry in data['consumptions'] if entry.get('type') == 'DATA'][0]
+    data_dic = {}
+    for (key, field) in (('current', 'used'), ('limit', 'max'), ('estimation', 'estimated')):
+        if usage.get(field):
+            data_dic[key + '_bytes'] = _volume(usage[field])
+            data_dic[key] = format_bytes(data_dic[key + '_bytes'])
+    data_dic['remaining'] = 'unknown'
+    return data_dic
+
+def build_tariff(data, _base_url):
+    """ plan data in the format of parser.tariff_contract() """
+    plandata_dic = {'tariff': data['tariff']['name']}
+    if data['tariff'].get('monthlyFee'):
+        plandata_dic['price'] = '{0} € monatlich'.format(format_money(data['tariff']['monthlyFee']['amount']))
+    contract = data.get('contract', {})
+    for (label, field, convert) in (('Vertragsbeginn:', 'startDate', format_date), ('Mindestvertragslaufzeit:', 'minimumTerm', None), ('Vertragsende:', 'endDate', format_date), ('Kündigungsfrist:', 'noticePeriod', None), ('Verlängerbar ab:', 'renewableFrom', format_date)):
+        if contract.get(field):
+            plandata_dic[label] = convert(contract[field]) if convert else contract[field]
+    return plandata_dic
+
+def build_numbers(data, _base_url):
+    """ phone numbers in the format of parser.numbers() """
+    return dict((entry['msisdn'], entry['tariffName']) for entry in data['subscriptions'])
+
+def build_bills(data, base_url):
+    """ list of bills in the format of parser.bills() """
+    bill_list = []
+    for bill in data['bills']:
+        text = 'Rechnung vom {0}'.format(format_date(bill['billDate'], '%d.%m.%y'))
+        bill_list.append({
+            'price': '{0}€'.format(format_money(bill['amount']['amount'])),
+            'text': 'Aktuelle ' + text if bill.get('current') else text,
+            'download': base_url + bill['documentUrl'],
+        })
+    return bill_list
+
+BUILDERS = {
+    'usage': build_usage,
+    'tariff': build_tariff,
+    'numbers': build_numbers,
+    'bills': build_bills,
+}
+
+def _digits(value):
+    """ digits of a phone number or subscription id ('0176-1234567' -> '01761234567') """
+    return re.sub(r'[^0-9]', '', str(value))
+
+class NetworkCapture(object):
+    """ collects json responses from the performance log of a chrome driver
+
+        number is the phone number expected in the number specific responses (None: not checked)
+    """
+
+    def __init__(self, patterns=None, timeout=5, poll_frequency=0.1, debug=False):
+        self.patterns = dict((section, re.compile(pattern)) for (section, pattern) in (patterns or API_PATTERNS).items())
+        self.timeout = timeout
+        self.poll_frequency = poll_frequency
+        self.debug = debug
+        self.supported = True
+        self.pending = {}
+        self.responses = {}
+        self.number = None
+        # sections whose endpoint has not been requested by the portal: not waited for again
+        self.missing = set()
+
+    def _body(self, driver, request_id):
+        """ fetch and decode the body of a response """
+        body = driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id})
+        content = base64.b64decode(body['body']).decode('utf-8') if body.get('base64Encoded') else body['body']
+        return json.loads(content)
+
+    def _drain(self, driver):
+        """ read new entries of the performance log """
+        try:
+            entries = driver.get_log('performance')
+        except BaseException as err: # pylint: disable=W0703
+            # firefox and drivers started without performance logging
+            if self.debug:
+                print('network capture not supported: {0}'.format(err))
+            self.supported = False
+            return
+        for entry in entries:
+            message = json.loads(entry['message'])['message']
+            params = message.get('params', {})
+            if message['method'] == 'Network.responseReceived':
+                response = params['response']
+                if 'json' not in response.get('mimeType', ''):
+                    continue
+                for (section, pattern) in self.patterns.items():
+                    if pattern.search(response['url']):
+                        self.pending[params['requestId']] = section
+                        self.missing.discard(section)
+            elif message['method'] == 'Network.loadingFinished' and params.get('requestId') in self.pending:
+                section = self.pending.pop(params['requestId'])
+                try:
+                    self.responses[section] = self._body(driver, params['requestId'])
+                except BaseException as err: # pylint: disable=W0703
+                    if self.debug:
+                        print('could not read {0} response: {1}'.format(section, err))
+
+    def mark(self, driver):
+        """ a different number or view is about to be loaded: drop number specific responses """
+        if not self.supported:
+            return
+        self._drain(driver)
+        self.pending = dict((key, section) for (key, section) in self.pending.items() if section not in NUMBER_SECTIONS)
+        for section in NUMBER_SECTIONS:
+            self.responses.pop(section, None)
+
+    def get(self, driver, section, timeout=None):
+        """ wait for the json response of a section
+
+            returns:
+                decoded json or None in case nothing has been captured within timeout seconds
+                (responses of a different number than the expected one are skipped)
+        """
+        if timeout is None:
+            timeout = self.timeout
+        deadline = None
+        while self.supported:
+            self._drain(driver)
+            if section in self.responses:
+                data = self.responses.pop(section)
+                if not self._other_number(section, data):
+                    return data
+                # a late response of the number shown before: wait for the one of the expected number
+                if self.debug:
+                    print('{0} response of {1} dropped, expected {2}'.format(section, data['subscriptionId'], self.number))
+            if deadline is None:
+                # an earlier lookup showed that the portal does not request the endpoint: do not wait for it again
+                deadline = time.time() + (0 if section in self.missing else timeout)
+            if time.time() >= deadline:
+                break
+            time.sleep(self.poll_frequency)
+        if self.supported and section not in self.pending.values():
+            self.missing.add(section)
+        return None
+
+    def _other_number(self, section, data):
+        """ check if a number specific response belongs to a different number than the expected one """
+        if section not in NUMBER_SECTIONS or not self.number or not isinstance(data, dict) or not data.get('subscriptionId'):
+            return False
+        return _digits(data['subscriptionId']) != _digits(self.number)
+
+    def result(self, driver, section, base_url, timeout=None):
+        """ result of a section built from the captured json response
+
+            args:
+                driver   - selenium driver object
+                section  - usage, tariff, numbers or bills
+                base_url - base url of the portal (used for download links)
+                timeout  - time to wait for the response (default: self.timeout)
+
+            returns:
+                result in the format of the corresponding parser method or None (use the dom instead)
+        """
+        with tracer.span('capture.{0}'.format(section)):
+            data = self.get(driver, section, timeout)
+            if data is None:
+                return None
+            try:
+                return BUILDERS[section](data, base_url)
+            except (KeyError, IndexError, TypeError, ValueError) as err:
+                if self.debug:
+                    print('unexpected {0} response: {1}'.format(section, err))
+                return None
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+""" failure-only diagnostics: ring buffer of recent steps and asynchronous writing of dom and screenshot """
+
+from __future__ import print_function
+import os
+import re
+import json
+import time
+import threading
+import collections
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+class Diagnostics(object):
+    """ keeps recent steps in memory and writes dom and screenshot only in case a step fails """
+
+    def __init__(self, directory='diagnostics', size=10, dom=True, max_dom=512 * 1024):
+        self.directory = directory
+        self.size = size
+        self.dom = dom
+        self.max_dom = max_dom
+        self.run_id = '{0}-{1}'.format(time.strftime('%Y%m%d-%H%M%S'), os.getpid())
+        self.lock = threading.Lock()
+        self.buffers = {}
+        self.seq = 0
+        self.queue = queue.Queue()
+        self.writer = None
+
+    def _buffer(self, account):
+        """ ring buffer of an account """
+        with self.lock:
+            return self.buffers.setdefault(account, collections.deque(maxlen=self.size))
+
+    def _snapshot(self, driver, step, buffer, dom=False):
+        """ page state: url, title and time since the previous step (plus the dom of a failed step) """
+        now = time.time()
+        state = {'time': now, 'step': step, 'elapsed': now - buffer[-1]['time'] if buffer else None}
+        try:
+            state['url'] = driver.current_url
+            state['title'] = driver.title
+            if dom and self.dom:
+                state['dom'] = driver.page_source[:self.max_dom]
+        except BaseException as err: # pylint: disable=W0703
+            state['error'] = str(err)
+        return state
+
+    def _write(self):
+        """ background writer """
+        while True:
+            (path, data) = self.queue.get()
+            try:
+                directory = os.path.dirname(path)
+                if not os.path.isdir(directory):
+                    os.makedirs(directory)
+                with open(path, 'wb') as fh_:
+                    fh_.write(data)
+            except (IOError, OSError) as err:
+                print('diagnostics: could not write {0}: {1}'.format(path, err))
+            finally:
+                self.queue.task_done()
+
+    def _enqueue(self, path, data):
+        """ hand a file over to the background writer """
+        with self.lock:
+            if not self.writer:
+                self.writer = threading.Thread(target=self._write)
+                self.writer.daemon = True
+                self.writer.start()
+        self.queue.put((path, data))
+
+    def checkpoint(self, driver, account, step):
+        """ record a step of an account (cheap: the dom is only taken on failure)
+
+            args:
+                driver  - selenium driver object
+                account - account name
+                step    - name of the step
+        """
+        buffer = self._buffer(account)
+        buffer.append(self._snapshot(driver, step, buffer))
+
+    def failure(self, driver, account, step):
+        """ a step failed: take dom and screenshot and write them together with the recent steps
+
+            args:
+                driver  - selenium driver object
+                account - account name
+                step    - name of the failed step
+
+            returns:
+                file name of the screenshot
+        """
+        with self.lock:
+            self.seq += 1
+            seq = self.seq
+        prefix = os.path.join(self.directory, self.run_id, re.sub(r'[^A-Za-z0-9_.@-]', '_', str(account)), '{0:03d}-{1}'.format(seq, step))
+
+        buffer = self._buffer(account)
+        buffer.append(self._snapshot(driver, step, buffer, dom=True))
+        self._enqueue(prefix + '.json', json.dumps(list(buffer), indent=2).encode('utf-8'))
+
+        try:
+            self._enqueue(prefix + '.png', driver.get_screenshot_as_png())
+        except BaseException as err: # pylint: disable=W0703
+            print('diagnostics: screenshot failed: {0}'.format(err))
+        return prefix + '.png'
+
+    def flush(self):
+        """ wait until all pending files have been written """
+        self.queue.join()
@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+""" exceptions raised by o2_scrap """
+
+class O2Error(Exception):
+    """ base class of all o2_scrap errors """
+
+class LoginError(O2Error):
+    """ the portal rejected the credentials (not retried) """
+
+class PortalUnavailable(O2Error):
+    """ the portal could not be reached or did not answer in time """
+
+class PageError(O2Error):
+    """ an expected page or element did not show up """
+
+class SessionClosed(O2Error):
+    """ the browser has been shut down (e.g. by a cancelled async call) while an operation was running (not retried) """
+
+class CircuitOpen(O2Error):
+    """ too many consecutive failures of an account; calls are rejected until the breaker resets """
+
+# errors worth another attempt
+RETRYABLE = (PortalUnavailable, PageError)
@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+""" streaming export of mobile contracts: one record per number and bill written as soon as it is extracted
+
+    usage: o2_scrap -u <user> [-f ndjson|csv] [-o <file>] [--rotate-bytes N] [--rotate-records N] [--numbers ...] [--no-bills]
+"""
+
+from __future__ import print_function
+import os
+import sys
+import abc
+import csv
+import json
+import time
+import argparse
+from .o2_scrap import O2mobile
+from .errors import O2Error
+from .models import DataUsage, PlanData, Bill
+
+# columns of the csv output (overview, bill and error records share one file)
+FIELDS = (
+    'record', 'time', 'number', 'tariff', 'price', 'current', 'limit', 'estimation', 'ratio',
+    'start', 'end', 'renewable', 'cancel_by', 'bill_date', 'amount', 'is_current', 'download', 'error',
+)
+
+def overview_record(number, overview):
+    """ flat record of a dictionary as returned by O2mobile.get_overview() """
+    record = {'record': 'overview', 'time': time.time(), 'number': number}
+    if 'data-usage' in overview:
+        usage = DataUsage.from_dict(overview['data-usage'])
+        record.update(usage.as_dict())
+        record['ratio'] = usage.ratio
+    if 'plan-data' in overview:
+        record.update(PlanData.from_dict(overview['plan-data']).as_dict())
+    return record
+
+def bill_record(bill):
+    """ flat record of a bill as returned by O2mobile.get_bills() """
+    data = Bill.from_dict(bill).as_dict()
+    return {'record': 'bill', 'time': time.time(), 'bill_date': data['date'], 'amount': data['amount'], 'is_current': data['current'], 'download': data['download']}
+
+def error_record(number, err):
+    """ record of a number which could not be extracted """
+    return {'record': 'error', 'time': time.time(), 'number': number, 'error': str(err)}
+
+def records(o2m, numbers=None, bills=True, workers=1):
+    """ extract records from a logged in O2mobile object
+
+        args:
+            o2m     - O2mobile object
+            numbers - list of phone numbers (None or empty: all numbers returned by get_numbers())
+            bills   - include the bills of the contract
+            workers - number of browser instances used in parallel
+
+        returns:
+            generator yielding overview, bill and error records one by one
+    """
+    if not numbers:
+        numbers = sorted(o2m.get_numbers())
+    if workers > 1:
+        for (number, overview) in o2m.get_overviews(numbers, workers, return_exceptions=True):
+            if isinstance(overview, O2Error):
+                # keep going with the remaining numbers
+                yield error_record(number, overview)
+            elif isinstance(overview, BaseException):
+                raise overview
+            else:
+                yield overview_record(number, overview)
+    else:
+        for number in numbers:
+            try:
+                overview = o2m.get_overview(number)
+            except O2Error as err:
+                # keep going with the remaining numbers
+                yield error_record(number, err)
+                continue
+            yield overview_record(number, overview)
+    if bills:
+        for bill in o2m.get_bills():
+            yield bill_record(bill)
+
+class RecordWriter(object, metaclass=abc.ABCMeta):
+    """ writes records to a file (or stdout) flushing every record; subclasses implement _write()
+
+        args:
+            filename    - output file (None: stdout)
+            max_bytes   - rotate the file once it exceeds this size
+            max_records - rotate the file after this number of records
+    """
+
+    def __init__(self, filename=None, max_bytes=None, max_records=None):
+        self.filename = filename
+        self.max_bytes = max_bytes
+        self.max_records = max_records
+        self.fh_ = None
+        self.records = 0
+        self.total = 0
+        self._open()
+
+    def __enter__(self):
+        """ Makes RecordWriter a Context Manager """
+        return self
+
+    def __exit__(self, *args):
+        """ close the output at the end of the context """
+        self.close()
+
+    def _open(self):
+        """ open the output and start a new file """
+        if self.filename:
+            self.fh_ = open(self.filename, 'a', newline='')
+        else:
+            self.fh_ = sys.stdout
+        self.records = 0
+        self._start()
+
+    def _start(self):
+        """ hook called for every new output file """
+
+    @abc.abstractmethod
+    def _write(self, record):
+        """ write a single record """
+
+    def _rotated_name(self):
+        """ name of the file the current output gets renamed to """
+        name = '{0}.{1}'.format(self.filename, time.strftime('%Y%m%d%H%M%S'))
+        cnt = 1
+        while os.path.exists(name if cnt == 1 else '{0}-{1}'.format(name, cnt)):
+            cnt += 1
+        return name if cnt == 1 else '{0}-{1}'.format(name, cnt)
+
+    def rotate(self):
+        """ move the current file aside and continue with a new one """
+        if not self.filename:
+            return
+        self.fh_.close()
+        os.rename(self.filename, self._rotated_name())
+        self._open()
+
+    def _needs_rotation(self):
+        """ check if the current file reached max_records or max_bytes """
+        if not self.filename or not self.records:
+            return False
+        if self.max_records and self.records >= self.max_records:
+            return True
+        return bool(self.max_bytes) and self.fh_.tell() >= self.max_bytes
+
+    def write(self, record):
+        """ write a record and flush it to the output """
+        if self._needs_rotation():
+            self.rotate()
+        self._write(record)
+        self.fh_.flush()
+        self.records += 1
+        self.total += 1
+
+    def close(self):
+        """ close the output file """
+        if self.fh_ and self.fh_ is not sys.stdout:
+            self.fh_.close()
+        self.fh_ = None
+
+class NdjsonWriter(RecordWriter):
+    """ one json document per line """
+
+    def _write(self, record):
+        self.fh_.write(json.dumps(record, sort_keys=True) + '\n')
+
+class CsvWriter(RecordWriter):
+    """ csv with a header line per file; columns see FIELDS """
+
+    def __init__(self, filename=None, max_bytes=None, max_records=None):
+        # created for every new output file
+        self.writer = None
+        super(CsvWriter, self).__init__(filename, max_bytes, max_records)
+
+    def _start(self):
+        self.writer = csv.DictWriter(self.fh_, FIELDS, extrasaction='ignore')
+        if self.fh_ is sys.stdout or self.fh_.tell() == 0:
+            self.writer.writeheader()
+
+    def _write(self, record):
+        self.writer.writerow(record)
+
+WRITERS = {
+    'ndjson': NdjsonWriter,
+    'csv': CsvWriter,
+}
+
+def export(o2m, writer, numbers=None, bills=True, workers=1):
+    """ write all records of a contract
+
+        returns:
+            number of records written
+    """
+    written = 0
+    for record in records(o2m, numbers, bills, workers):
+        writer.write(record)
+        written += 1
+    return written
+
+def main():
+    """ console entry point """
+    aparser = argparse.ArgumentParser(description='export data usage, plan data and bills of an o2 mobile contract')
+    aparser.add_argument('-u', '--user', required=True, help='username')
+    aparser.add_argument('--password-env', default='O2_PASSWORD', help='environment variable containing the password (default: O2_PASSWORD)')
+    aparser.add_argument('-f', '--format', choices=sorted(WRITERS), default='ndjson', help='output format')
+    aparser.add_argument('-o', '--output', help='output file (default: stdout)')
+    aparser.add_argument('--rotate-bytes', type=int, help='rotate the output file once it exceeds this size')
+    aparser.add_argument('--rotate-records', type=int, help='rotate the output file after this number of records')
+    aparser.add_argument('--numbers', nargs='*', help='phone numbers to export (default: all numbers of the contract)')
+    aparser.add_argument('--no-bills', action='store_true', help='skip the bills')
+    aparser.add_argument('--workers', type=int, default=1, help='number of browser instances used in parallel')
+    aparser.add_argument('--browser', choices=('firefox', 'chrome'), default='firefox', help='browser to be used')
+    aparser.add_argument('--session-dir', help='directory to keep the session in between two runs')
+    aparser.add_argument('--debug', action='store_true', help='show debug messages')
+    args = aparser.parse_args()
+
+    pwd = os.environ.get(args.password_env)
+    if not pwd:
+        aparser.error('password missing: set the environment variable {0}'.format(args.password_env))
+
+    with WRITERS[args.format](args.output, args.rotate_bytes, args.rotate_records) as writer:
+        try:
+            with O2mobile(args.user, pwd, args.debug, browser=args.browser, session_dir=args.session_dir) as o2m:
+                # --numbers without a value exports all numbers as well
+                export(o2m, writer, args.numbers or None, not args.no_bills, args.workers)
+        except O2Error as err:
+            print('export failed after {0} records: {1}'.format(writer.total, err), file=sys.stderr)
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+""" deferred imports of heavy dependencies (selenium, requests, bs4) """
+
+import importlib
+
+class LazyModule(object):
+    """ proxy importing a module (or an attribute of it) on first use
+
+        args:
+            name - module name
+            attr - optional attribute of the module the proxy stands for
+    """
+
+    def __init__(self, name, attr=None):
+        self._name = name
+        self._attr = attr
+        self._target = None
+
+    def _resolve(self):
+        """ import the module and cache the target """
+        if self._target is None:
+            target = importlib.import_module(self._name)
+            if self._attr:
+                target = getattr(target, self._attr)
+            self._target = target
+        return self._target
+
+    def __getattr__(self, name):
+        return getattr(self._resolve(), name)
+
+    def __call__(self, *args, **kwargs):
+        return self._resolve()(*args, **kwargs)
+
+    def __repr__(self):
+        return '<lazy {0}{1}>'.format(self._name, '.' + self._attr if self._attr else '')
@@ -0,0 +1,304 @@
+# -*- coding: utf-8 -*-
+""" lifecycle of selenium drivers: quit and reap process trees, recycle by memory, age or usage """
+
+from __future__ import print_function
+import os
+import time
+import atexit
+import signal
+import threading
+from .trace import tracer
+
+# limits after which a driver gets recycled (None: no limit)
+#   max_rss      - memory (in bytes) used by driver and browser processes
+#   max_age      - time (in seconds) since the driver has been started
+#   max_ops      - number of operations (logins, get_overview(), get_bills() ...)
+#   kill_timeout - time (in seconds) leftover processes get to terminate before they are killed
+driver_config = {
+    'max_rss': None,
+    'max_age': None,
+    'max_ops': None,
+    'kill_timeout': 5,
+}
+
+def _proc_table():
+    """ process table from /proc
+
+        returns:
+            dictionary {pid: (ppid, rss in bytes, state)}
+    """
+    pagesize = os.sysconf('SC_PAGE_SIZE')
+    table = {}
+    for name in os.listdir('/proc'):
+        if not name.isdigit():
+            continue
+        try:
+            with open('/proc/{0}/stat'.format(name), 'r') as fh_:
+                # the process name may contain spaces and brackets
+                fields = fh_.read().rsplit(')', 1)[1].split()
+        except (IOError, OSError, IndexError):
+            # process terminated in the meantime
+            continue
+        table[int(name)] = (int(fields[1]), int(fields[21]) * pagesize, fields[0])
+    return table
+
+def _ps_table():
+    """ process table from ps (systems without /proc) """
+    # only needed on systems without /proc
+    import subprocess
+    table = {}
+    try:
+        output = subprocess.check_output(['ps', '-A', '-o', 'pid=,ppid=,rss=,state='])
+    except subprocess.CalledProcessError:
+        return table
+    for line in output.decode('utf-8', 'replace').splitlines():
+        fields = line.split()
+        if len(fields) >= 4:
+            table[int(fields[0])] = (int(fields[1]), int(fields[2]) * 1024, fields[3][0])
+    return table
+
+def process_table():
+    """ snapshot of all processes
+
+        returns:
+            dictionary {pid: (ppid, rss in bytes, state)} (empty if the processes cannot be listed)
+    """
+    try:
+        if os.path.isdir('/proc'):
+            return _proc_table()
+        return _ps_table()
+    except (OSError, ValueError, AttributeError):
+        return {}
+
+def process_tree(pid, table=None):
+    """ pid and all descendants of a process
+
+        args:
+            pid   - process id
+            table - result of process_table() (taken if omitted)
+
+        returns:
+            list of process ids
+    """
+    if table is None:
+        table = process_table()
+    children = {}
+    for (child, entry) in table.items():
+        children.setdefault(entry[0], []).append(child)
+    tree = []
+    todo = [pid]
+    while todo:
+        current = todo.pop()
+        if current in tree:
+            continue
+        tree.append(current)
+        todo.extend(children.get(current, []))
+    return tree
+
+def _alive(pid):
+    """ check if a process is still running (zombies count as terminated) """
+    try:
+        os.kill(pid, 0)
+    except OSError:
+        return False
+    try:
+        with open('/proc/{0}/stat'.format(pid), 'r') as fh_:
+            return fh_.read().rsplit(')', 1)[1].split()[0] != 'Z'
+    except (IOError, OSError, IndexError):
+        return True
+
+def driver_pid(driver):
+    """ process id of the driver service (geckodriver, chromedriver) or None """
+    service = getattr(driver, 'service', None)
+    process = getattr(service, 'process', None)
+    return getattr(process, 'pid', None)
+
+class DriverManager(object):
+    """ keeps track of all running drivers, quits them including their process trees and
+        decides when a driver has to be recycled """
+
+    def __init__(self, debug=False):
+        self.debug = debug
+        self.lock = threading.Lock()
+        # id(driver) -> {'driver', 'pid', 'started', 'ops'}
+        self.drivers = {}
+        self.counters = {'started': 0, 'quit': 0, 'recycled': 0, 'reaped': 0}
+        self.installed = False
+
+    def install(self):
+        """ quit all drivers at interpreter exit and on signals terminating the process """
+        with self.lock:
+            if self.installed:
+                return
+            self.installed = True
+        atexit.register(self.quit_all)
+        if threading.current_thread() is not threading.main_thread():
+            # signal handlers can only be set from the main thread
+            return
+        for name in ('SIGTERM', 'SIGHUP'):
+            signum = getattr(signal, name, None)
+            if signum is not None and signal.getsignal(signum) == signal.SIG_DFL:
+                # applications having their own handler shut down gracefully and end up in atexit
+                signal.signal(signum, self._on_signal)
+
+    def _on_signal(self, signum, _frame):
+        """ quit all drivers and terminate with the default action of the signal """
+        self.quit_all()
+        signal.signal(signum, signal.SIG_DFL)
+        os.kill(os.getpid(), signum)
+
+    def register(self, driver):
+        """ start tracking a newly started driver
+
+            returns:
+                driver
+        """
+        with self.lock:
+            self.drivers[id(driver)] = {'driver': driver, 'pid': driver_pid(driver), 'started': time.time(), 'ops': 0}
+            self.counters['started'] += 1
+        self.install()
+        return driver
+
+    def touch(self, driver):
+        """ count an operation executed by a driver """
+        with self.lock:
+            entry = self.drivers.get(id(driver))
+            if entry:
+                entry['ops'] += 1
+
+    def info(self, driver, table=None):
+        """ usage of a driver
+
+            returns:
+                dictionary (age, ops, rss, processes) or None for untracked drivers
+        """
+        with self.lock:
+            entry = self.drivers.get(id(driver))
+            if not entry:
+                return None
+            entry = dict(entry)
+        result = {'age': time.time() - entry['started'], 'ops': entry['ops'], 'rss': None, 'processes': None}
+        if entry['pid']:
+            if table is None:
+                table = process_table()
+            if table:
+                tree = [pid for pid in process_tree(entry['pid'], table) if pid in table]
+                result['processes'] = len(tree)
+                result['rss'] = sum(table[pid][1] for pid in tree)
+        return result
+
+    def expired(self, driver):
+        """ check the limits in driver_config
+
+            returns:
+                reason (string) in case the driver has to be recycled, None otherwise
+        """
+        with self.lock:
+            entry = self.drivers.get(id(driver))
+            if not entry:
+                return None
+            (started, ops) = (entry['started'], entry['ops'])
+        if driver_config['max_ops'] is not None and ops >= driver_config['max_ops']:
+            return 'ops'
+        if driver_config['max_age'] is not None and time.time() - started >= driver_config['max_age']:
+            return 'age'
+        if driver_config['max_rss'] is not None:
+            # reading the process table is the expensive check
+            info = self.info(driver)
+            if info and info['rss'] is not None and info['rss'] >= driver_config['max_rss']:
+                return 'rss'
+        return None
+
+    def recycled(self, reason):
+        """ count a driver replaced because of its limits """
+        with self.lock:
+            self.counters['recycled'] += 1
+        if self.debug:
+            print('driver recycled ({0})'.format(reason))
+
+    def quit(self, driver):
+        """ quit a driver and kill all processes of it which are still alive afterwards """
+        with self.lock:
+            entry = self.drivers.pop(id(driver), None)
+        pid = entry['pid'] if entry else driver_pid(driver)
+        # the browser gets re-parented once the driver service exits: collect the tree beforehand
+        tree = process_tree(pid) if pid else []
+        with tracer.span('driver.quit', processes=len(tree)):
+            try:
+                driver.quit()
+            except BaseException as err: # pylint: disable=W0703
+                if self.debug:
+                    print('driver.quit() failed: {0}'.format(err))
+            reaped = self.reap(tree)
+        with self.lock:
+            self.counters['quit'] += 1
+            self.counters['reaped'] += reaped
+
+    def reap(self, pids):
+        """ terminate processes (SIGTERM first, SIGKILL after kill_timeout)
+
+            returns:
+                number of processes which had to be terminated
+        """
+        alive = [pid for pid in pids if pid != os.getpid() and _alive(pid)]
+        if not alive:
+            return 0
+        if self.debug:
+            print('reaping leftover driver processes: {0}'.format(alive))
+        for pid in alive:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except OSError:
+                pass
+        deadline = time.time() + driver_config['kill_timeout']
+        remaining = alive
+        while remaining and time.time() < deadline:
+            time.sleep(0.1)
+            remaining = [pid for pid in remaining if _alive(pid)]
+        for pid in remaining:
+            try:
+                os.kill(pid, getattr(signal, 'SIGKILL', signal.SIGTERM))
+            except OSError:
+                pass
+        return len(alive)
+
+    def quit_all(self):
+        """ quit all tracked drivers """
+        with self.lock:
+            running = [entry['driver'] for entry in self.drivers.values()]
+        for driver in running:
+            self.quit(driver)
+
+    def summary(self):
+        """ get statistics of all tracked drivers
+
+            returns:
+                dictionary with the counters (started, quit, recycled, reaped), the number of running drivers,
+                their total rss and a list with age, ops and rss per driver
+        """
+        with self.lock:
+            running = [entry['driver'] for entry in self.drivers.values()]
+            result = dict(self.counters)
+        table = process_table() if running else {}
+        result['drivers'] = [info for info in (self.info(driver, table) for driver in running) if info]
+        result['running'] = len(result['drivers'])
+        result['rss'] = sum(info['rss'] or 0 for info in result['drivers'])
+        return result
+
+    def gauges(self):
+        """ metrics for PrometheusSink(gauges=...)
+
+            returns:
+                dictionary {metric name: value}
+        """
+        summary = self.summary()
+        return {
+            'drivers_running': summary['running'],
+            'drivers_rss_bytes': summary['rss'],
+            'drivers_oldest_seconds': max([info['age'] for info in summary['drivers']] or [0]),
+            'drivers_started_total': summary['started'],
+            'drivers_recycled_total': summary['recycled'],
+            'drivers_reaped_processes_total': summary['reaped'],
+        }
+
+drivers = DriverManager()
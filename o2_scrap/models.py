@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+""" typed result records with numeric values (bytes, cents, dates) """
+
+from __future__ import print_function
+import re
+from datetime import date
+
+UNKNOWN = -1
+UNITS = {'B': 1, 'KB': 1024, 'MB': 1024 ** 2, 'GB': 1024 ** 3, 'TB': 1024 ** 4}
+
+# precompiled patterns
+SIZE = re.compile(r'([0-9][0-9.,]*)\s*([KMGT]?B)\b', re.I)
+MONEY = re.compile(r'(-?[0-9][0-9.]*)(?:,([0-9]{1,2}))?\s*(?:€|EUR)', re.I)
+DATE = re.compile(r'\b([0-9]{1,2})\.([0-9]{1,2})\.([0-9]{4}|[0-9]{2})\b')
+NUMBER = re.compile(r'[0-9]+')
+
+# plan-data labels as shown on the portal
+PLAN_DATES = {
+    'Vertragsbeginn:': 'start',
+    'Vertragsende:': 'end',
+    'Verlängerbar ab:': 'renewable',
+    'spätester Kündigungstermin:': 'cancel_by',
+}
+
+def parse_bytes(text):
+    """ convert a size string like '1,22 GB' into bytes (UNKNOWN if not parseable) """
+    match = SIZE.search(text or '')
+    if not match:
+        return UNKNOWN
+    value = float(match.group(1).replace('.', '').replace(',', '.'))
+    return int(value * UNITS[match.group(2).upper()])
+
+def parse_cents(text):
+    """ convert a price string like '19,99 €' into cents (UNKNOWN if not parseable) """
+    match = MONEY.search(text or '')
+    if not match:
+        return UNKNOWN
+    sign = -1 if match.group(1).startswith('-') else 1
+    euro = int(match.group(1).lstrip('-').replace('.', ''))
+    return sign * (euro * 100 + int((match.group(2) or '0').ljust(2, '0')))
+
+def parse_date(text):
+    """ convert a german date like '16.08.2024' or '03.01.18' into a date object (None if not parseable) """
+    match = DATE.search(text or '')
+    if not match:
+        return None
+    (day, month, year) = (int(match.group(1)), int(match.group(2)), int(match.group(3)))
+    if len(match.group(3)) == 2:
+        year += 2000
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+def gbytes(value):
+    """ convert a number of GB as reported by the dsl portal into bytes (UNKNOWN if missing) """
+    return int(value * UNITS['GB']) if value is not None else UNKNOWN
+
+def _isodate(value):
+    """ date as iso string (None stays None) """
+    return value.isoformat() if value else None
+
+class _Record(object):
+    """ common methods of all records """
+    __slots__ = ()
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.as_dict() == other.as_dict()
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return '{0}({1})'.format(type(self).__name__, ', '.join('{0}={1!r}'.format(slot, getattr(self, slot)) for slot in self.__slots__))
+
+    def as_dict(self):
+        """ record as json serializable dictionary """
+        result = {}
+        for slot in self.__slots__:
+            value = getattr(self, slot)
+            result[slot] = _isodate(value) if isinstance(value, date) else value
+        return result
+
+class DataUsage(_Record):
+    """ mobile data usage in bytes """
+    __slots__ = ('current', 'limit', 'estimation')
+
+    def __init__(self, current=UNKNOWN, limit=UNKNOWN, estimation=UNKNOWN):
+        self.current = current
+        self.limit = limit
+        self.estimation = estimation
+
+    @classmethod
+    def from_dict(cls, data_dic):
+        """ create a record from a 'data-usage' dictionary as returned by get_data_usage()
+            (exact byte counts taken from a network capture are preferred over the rounded sizes) """
+        values = []
+        for key in ('current', 'limit', 'estimation'):
+            exact = data_dic.get(key + '_bytes')
+            values.append(int(exact) if exact is not None else parse_bytes(data_dic.get(key)))
+        return cls(*values)
+
+    @property
+    def ratio(self):
+        """ used share of the limit (None if unknown) """
+        if self.current == UNKNOWN or self.limit <= 0:
+            return None
+        return float(self.current) / self.limit
+
+class PlanData(_Record):
+    """ tariff details; price in cents """
+    __slots__ = ('tariff', 'price', 'start', 'end', 'renewable', 'cancel_by', 'details')
+
+    def __init__(self, tariff=None, price=UNKNOWN, start=None, end=None, renewable=None, cancel_by=None, details=None):
+        self.tariff = tariff
+        self.price = price
+        self.start = start
+        self.end = end
+        self.renewable = renewable
+        self.cancel_by = cancel_by
+        self.details = details or {}
+
+    @classmethod
+    def from_dict(cls, plandata_dic):
+        """ create a record from a 'plan-data' dictionary as returned by get_overview() """
+        record = cls(plandata_dic.get('tariff'), parse_cents(plandata_dic.get('price')))
+        for (key, value) in plandata_dic.items():
+            if key in PLAN_DATES:
+                setattr(record, PLAN_DATES[key], parse_date(value))
+            elif key not in ('tariff', 'price'):
+                record.details[key.rstrip(':')] = value
+        return record
+
+class Bill(_Record):
+    """ bill; amount in cents """
+    __slots__ = ('date', 'amount', 'current', 'download')
+
+    def __init__(self, bill_date=None, amount=UNKNOWN, current=False, download=None):
+        self.date = bill_date
+        self.amount = amount
+        self.current = current
+        self.download = download
+
+    @classmethod
+    def from_dict(cls, bill_dic):
+        """ create a record from a bill dictionary as returned by get_bills() """
+        text = bill_dic.get('text', '')
+        return cls(parse_date(text), parse_cents(bill_dic.get('price')), text.startswith('Aktuelle'), bill_dic.get('download'))
+
+class DslUsage(_Record):
+    """ dsl usage in bytes; history is a list of (from, to, bytes) tuples """
+    __slots__ = ('used', 'limit', 'prognosed', 'since', 'days_remaining', 'history')
+
+    def __init__(self, used=UNKNOWN, limit=UNKNOWN, prognosed=UNKNOWN, since=None, days_remaining=None, history=None):
+        self.used = used
+        self.limit = limit
+        self.prognosed = prognosed
+        self.since = since
+        self.days_remaining = days_remaining
+        self.history = history or []
+
+    @classmethod
+    def from_dict(cls, data_dic):
+        """ create a record from a dictionary as returned by O2dsl.get_overview() (values in GB) """
+        remaining = NUMBER.search(data_dic.get('remaining', ''))
+        history = [(entry['from'], entry['to'], gbytes(entry['usage'])) for entry in data_dic.get('history', [])]
+        return cls(gbytes(data_dic.get('used')), gbytes(data_dic.get('limit')), gbytes(data_dic.get('prognosed')), parse_date(data_dic.get('since')), int(remaining.group(0)) if remaining else None, history)
+
+def overview_records(number_dict):
+    """ convert a dictionary as returned by O2mobile.get_overview() into records
+
+        returns:
+            dictionary with DataUsage and PlanData records ('data-usage', 'plan-data')
+    """
+    result = {}
+    if 'data-usage' in number_dict:
+        result['data-usage'] = DataUsage.from_dict(number_dict['data-usage'])
+    if 'plan-data' in number_dict:
+        result['plan-data'] = PlanData.from_dict(number_dict['plan-data'])
+    return result
@@ -3,32 +3,324 @@
 """ o2online screen scrap library """
 
 from __future__ import print_function
-import sys
+import os
 import re
 import time
+import json
+import hashlib
+import base64
+import threading
+from concurrent.futures import ThreadPoolExecutor
+try:
+    import queue
+except ImportError:
+    import Queue as queue
 from datetime import datetime
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.common.exceptions import TimeoutException
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.common.by import By
-from selenium.common.exceptions import NoSuchElementException
-from selenium.webdriver.firefox.options import Options as FirefoxOptions
-from selenium.webdriver.chrome.options import Options as ChromeOptions
-
-if sys.version_info > (3, 0):
-    import importlib
-    importlib.reload(sys)
-else:
-    reload(sys) # pylint: disable=E0602
-    sys.setdefaultencoding('utf8') # pylint: disable=E1101
+try:
+    from urllib.parse import urljoin, urlsplit
+except ImportError:
+    from urlparse import urljoin, urlsplit
+from .lazy import LazyModule
+from .capture import NetworkCapture
+from .errors import LoginError, PortalUnavailable, PageError, SessionClosed, RETRYABLE
+from .retry import RetryPolicy, get_breaker, retry_call
+from .lifecycle import drivers
+from .trace import tracer, traced
+
+# heavy dependencies get imported on first use to keep the import of o2_scrap cheap
+requests = LazyModule('requests')
+webdriver = LazyModule('selenium.webdriver')
+selenium_exceptions = LazyModule('selenium.common.exceptions')
+EC = LazyModule('selenium.webdriver.support.expected_conditions')
+# proxies of classes keep the names of the classes
+# pylint: disable=C0103
+By = LazyModule('selenium.webdriver.common.by', 'By')
+WebDriverWait = LazyModule('selenium.webdriver.support.ui', 'WebDriverWait')
+FirefoxOptions = LazyModule('selenium.webdriver.firefox.options', 'Options')
+ChromeOptions = LazyModule('selenium.webdriver.chrome.options', 'Options')
+# pylint: enable=C0103
+parsers = LazyModule(__package__ + '.parser')
 
 def print_debug(debug, text):
     """ little helper to print debug messages """
     if debug:
         print('{0}: {1}'.format(datetime.now(), text))
 
+PAC_TEMPLATE = """function FindProxyForURL(url, host) {{
+    var allow = {allow};
+    var deny = {deny};
+    for (var i = 0; i < allow.length; i++) {{
+        if (host == allow[i] || dnsDomainIs(host, '.' + allow[i])) {{ return 'DIRECT'; }}
+    }}
+    for (var i = 0; i < deny.length; i++) {{
+        if (host == deny[i] || dnsDomainIs(host, '.' + deny[i])) {{ return 'PROXY 127.0.0.1:9'; }}
+    }}
+    return 'DIRECT';
+}}"""
+
+def pac_url(deny_hosts, allow_hosts):
+    """ build a proxy-autoconfig data url sending requests to denied hosts into nowhere
+
+        args:
+            deny_hosts  - list of domains to be blocked (including subdomains)
+            allow_hosts - list of domains which must never be blocked
+
+        returns:
+            data url to be used as proxy-autoconfig url
+    """
+    script = PAC_TEMPLATE.format(allow=json.dumps(list(allow_hosts)), deny=json.dumps(list(deny_hosts)))
+    return 'data:application/x-ns-proxy-autoconfig;base64,' + base64.b64encode(script.encode('utf-8')).decode('ascii')
+
+def session_file(session_dir, user):
+    """ file name used to store the session cookies of an account """
+    return os.path.join(session_dir, 'session-{0}.json'.format(hashlib.sha256(user.encode('utf-8')).hexdigest()[:16]))
+
+def load_session(session_dir, user):
+    """ load stored session cookies of an account
+
+        args:
+            session_dir - directory containing the session files
+            user        - username
+
+        returns:
+            list of cookies (empty in case no session has been stored)
+    """
+    try:
+        with open(session_file(session_dir, user), 'r') as fh_:
+            cookies = json.load(fh_)
+    except (IOError, OSError, ValueError):
+        cookies = []
+    now = time.time()
+    return [cookie for cookie in cookies if cookie.get('expiry', now + 1) > now]
+
+def save_session(session_dir, user, cookies):
+    """ store session cookies of an account (readable for the owner only)
+
+        args:
+            session_dir - directory containing the session files
+            user        - username
+            cookies     - list of cookies as returned by driver.get_cookies()
+    """
+    if not os.path.isdir(session_dir):
+        os.makedirs(session_dir, 0o700)
+    fname = session_file(session_dir, user)
+    keys = ('name', 'value', 'domain', 'path', 'secure', 'httpOnly', 'expiry')
+    cookies = [dict((key, cookie[key]) for key in keys if key in cookie) for cookie in cookies]
+    fhd = os.open(fname + '.tmp', os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fhd, 'w') as fh_:
+        json.dump(cookies, fh_)
+    os.rename(fname + '.tmp', fname)
+
+def restore_cookies(driver, cookies):
+    """ add stored cookies to the domain currently loaded in the driver """
+    for cookie in cookies:
+        try:
+            driver.add_cookie(cookie)
+        except selenium_exceptions.WebDriverException:
+            # cookie belongs to a different domain
+            pass
+
+# configuration of the wait engine
+#   poll_frequency - interval (in seconds) used to check wait conditions
+#   settle_time    - time (in ms) without dom mutations or network activity before a page counts as settled
+#   timeouts       - dictionary to override timeouts per element (key: "<etype>:<element>")
+wait_config = {
+    'poll_frequency': 0.2,
+    'settle_time': 300,
+    'timeouts': {},
+}
+
+PAGE_SETTLED_JS = """
+var quiet = arguments[0];
+if (document.readyState !== 'complete') { return false; }
+if (!window.__o2_mutation) {
+    window.__o2_mutation = Date.now();
+    new MutationObserver(function() { window.__o2_mutation = Date.now(); }).observe(document, {childList: true, subtree: true, attributes: true});
+    return false;
+}
+if (window.getAllAngularTestabilities) {
+    var testabilities = window.getAllAngularTestabilities();
+    for (var i = 0; i < testabilities.length; i++) {
+        if (!testabilities[i].isStable()) { return false; }
+    }
+}
+var resources = window.performance ? window.performance.getEntriesByType('resource').length : 0;
+if (window.__o2_resources !== resources) {
+    window.__o2_resources = resources;
+    window.__o2_mutation = Date.now();
+    return false;
+}
+return Date.now() - window.__o2_mutation >= quiet;
+"""
+
+class WaitStats(object):
+    """ records the duration of all waits to allow tuning of timeouts """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.data = {}
+
+    def record(self, name, duration, success):
+        """ record a single wait
+
+            args:
+                name     - name of the wait condition
+                duration - time waited in seconds
+                success  - True in case the condition has been met, False on timeout
+        """
+        with self.lock:
+            entry = self.data.setdefault(name, {'count': 0, 'timeouts': 0, 'total': 0.0, 'min': None, 'max': 0.0})
+            entry['count'] += 1
+            if not success:
+                entry['timeouts'] += 1
+            entry['total'] += duration
+            entry['max'] = max(entry['max'], duration)
+            entry['min'] = duration if entry['min'] is None else min(entry['min'], duration)
+
+    def reset(self):
+        """ drop all recorded waits """
+        with self.lock:
+            self.data = {}
+
+    def summary(self):
+        """ get statistics per wait condition
+
+            returns:
+                dictionary with count, timeouts, min, max and avg duration per wait condition
+        """
+        with self.lock:
+            result = {}
+            for (name, entry) in self.data.items():
+                result[name] = {'count': entry['count'], 'timeouts': entry['timeouts'], 'min': entry['min'], 'max': entry['max'], 'avg': entry['total'] / entry['count']}
+        return result
+
+wait_stats = WaitStats()
+
+def any_of(*conditions):
+    """ wait condition which is met as soon as one of the conditions is met """
+    def _predicate(driver):
+        for condition in conditions:
+            try:
+                result = condition(driver)
+            except (selenium_exceptions.NoSuchElementException, selenium_exceptions.WebDriverException):
+                result = False
+            if result:
+                return result
+        return False
+    return _predicate
+
+def first_of(driver, debug, conditions, timeout, name):
+    """ waits for several conditions at once and tells which one has been met
+
+        args:
+            driver     - selenium driver object
+            debug      - debug flag
+            conditions - list of (key, wait condition) tuples checked in this order
+            timeout    - time to wait in seconds
+            name       - name of the wait used for statistics and timeout overrides
+
+        returns:
+            key of the first condition met or None if timeout kicks in
+    """
+    matched = []
+    def _tagged(key, condition):
+        def _predicate(drv):
+            result = condition(drv)
+            if result:
+                matched.append(key)
+            return result
+        return _predicate
+    if wait_until(driver, debug, any_of(*[_tagged(key, condition) for (key, condition) in conditions]), timeout, name):
+        return matched[-1]
+    return None
+
+def all_of(*conditions):
+    """ wait condition which is met once all conditions are met """
+    def _predicate(driver):
+        results = []
+        for condition in conditions:
+            try:
+                result = condition(driver)
+            except (selenium_exceptions.NoSuchElementException, selenium_exceptions.WebDriverException):
+                result = False
+            if not result:
+                return False
+            results.append(result)
+        return results
+    return _predicate
+
+def page_settled(settle_time=None):
+    """ wait condition which is met once the page is loaded, angular is stable and
+        neither the dom nor the network showed activity for settle_time ms """
+    def _predicate(driver):
+        return driver.execute_script(PAGE_SETTLED_JS, settle_time if settle_time is not None else wait_config['settle_time'])
+    return _predicate
+
+def element_condition(ele, etype):
+    """ build a wait condition for an element to appear
+
+        args:
+            ele     - element to wait for
+            etype   - element type (could be id, id-starts-with, name, class, classpresent or a tag name)
+
+        returns:
+            wait condition
+    """
+    if etype == 'id':
+        element_present = EC.element_to_be_clickable((By.ID, ele))
+    elif etype == 'id-starts-with':
+        element_present = EC.element_to_be_clickable((By.XPATH, '//*[starts-with(@id,"%s")]' % ele))
+    elif etype == 'name':
+        element_present = EC.element_to_be_clickable((By.NAME, ele))
+    elif etype == 'class':
+        element_present = EC.element_to_be_clickable((By.CLASS_NAME, ele))
+    elif etype == 'classpresent':
+        element_present = EC.presence_of_element_located((By.XPATH, '//*[@class="%s"]' % (ele)))
+    else:
+        element_present = EC.presence_of_element_located((By.XPATH, '//%s[text()="%s"]' % (etype, ele)))
+    return element_present
+
+def wait_until(driver, debug, condition, timeout, name):
+    """ central wait function: waits for a condition and records the time waited
+
+        args:
+            driver    - selenium driver object
+            debug     - debug flag
+            condition - wait condition (see element_condition(), page_settled(), any_of(), all_of())
+            timeout   - time to wait in seconds (can be overridden via wait_config['timeouts'])
+            name      - name of the condition used for statistics and timeout overrides
+
+        returns:
+            True - in case the condition has been met
+            False - if timeout kicks in and aborts the function
+    """
+    timeout = wait_config['timeouts'].get(name, timeout)
+    start = time.time()
+    with tracer.span('wait', condition=name, timeout=timeout) as span:
+        try:
+            WebDriverWait(driver, timeout, poll_frequency=wait_config['poll_frequency']).until(condition)
+            result = True
+        except selenium_exceptions.TimeoutException:
+            result = False
+        span.set(found=result)
+    duration = time.time() - start
+    wait_stats.record(name, duration, result)
+    print_debug(debug, 'wait_until({0}): {1} after {2:.2f}s'.format(name, result, duration))
+    return result
+
+def wait_for_page(driver, debug, timeout):
+    """ waits for a page to settle (replaces fixed sleeps after navigation)
+
+        args:
+            driver  - selenium driver object
+            timeout - time to wait in seconds
+
+        returns:
+            True - in case the page settled
+            False - if timeout kicks in and aborts the function
+    """
+    return wait_until(driver, debug, page_settled(), timeout, 'page:settled')
+
 def wait_for_element(driver, debug, ele, etype, timeout):
     """ this function monitors a html page before executing the script further
         and waits for an element to appear
@@ -44,28 +336,13 @@ def wait_for_element(driver, debug, ele, etype, timeout):
             False - if timeout kicks in and aborts the function
     """
     print_debug(debug, 'wait_for_element: {0}:{1}:{2}'.format(etype, ele, timeout))
-    try:
-        if etype == 'id':
-            element_present = EC.element_to_be_clickable((By.ID, ele))
-        elif etype == 'id-starts-with':
-            element_present = EC.element_to_be_clickable((By.XPATH, '//*[starts-with(@id,"%s")]' % ele))
-        elif etype == 'name':
-            element_present = EC.element_to_be_clickable((By.NAME, ele))
-        elif etype == 'class':
-            element_present = EC.element_to_be_clickable((By.CLASS_NAME, ele))
-        elif etype == 'classpresent':
-            element_present = EC.presence_of_element_located((By.XPATH, '//*[@class="%s"]' % (ele)))
-        else:
-            element_present = EC.presence_of_element_located((By.XPATH, '//%s[text()="%s"]' % (etype, ele)))
-
-        WebDriverWait(driver, timeout).until(element_present)
+    if wait_until(driver, debug, element_condition(ele, etype), timeout, '{0}:{1}'.format(etype, ele)):
         print_debug(debug, "found {0}:{1}".format(etype, ele))
         return True
-    except TimeoutException:
-        print_debug(debug, "Timed out waiting for page to load {0}:{1}".format(etype, ele))
-        return False
+    print_debug(debug, "Timed out waiting for page to load {0}:{1}".format(etype, ele))
+    return False
 
-def wait_for_element_to_disappear(driver, _debug, ele, etype, timeout):
+def wait_for_element_to_disappear(driver, debug, ele, etype, timeout):
     """ this function monitors a html page before executing the script further
         and waits for an element to disappear
 
@@ -79,54 +356,374 @@ def wait_for_element_to_disappear(driver, _debug, ele, etype, timeout):
             True - in case the element was found
             False - if timeout kicks in and aborts the function
     """
-    try:
-        if etype == 'id':
-            element_not_present = EC.invisibility_of_element_located((By.ID, ele))
-        elif etype == 'name':
-            element_not_present = EC.invisibility_of_element_located((By.NAME, ele))
-        elif etype == 'class':
-            element_not_present = EC.invisibility_of_element_located((By.CLASS_NAME, ele))
-        else:
-            element_not_present = EC.invisibility_of_element_located((By.NAME, ele))
+    if etype == 'id':
+        element_not_present = EC.invisibility_of_element_located((By.ID, ele))
+    elif etype == 'name':
+        element_not_present = EC.invisibility_of_element_located((By.NAME, ele))
+    elif etype == 'class':
+        element_not_present = EC.invisibility_of_element_located((By.CLASS_NAME, ele))
+    else:
+        element_not_present = EC.invisibility_of_element_located((By.NAME, ele))
+
+    if wait_until(driver, debug, element_not_present, timeout, 'disappear-{0}:{1}'.format(etype, ele)):
+        return True
+    print("Timed out waiting for element to disappear")
+    return False
+
+def url_origin(url):
+    """ scheme and host of an url ('https://login.o2online.de') """
+    parts = urlsplit(url)
+    return '{0}://{1}'.format(parts.scheme, parts.netloc)
+
+class DriverPool(object):
+    """ pool of warm selenium drivers to be shared between O2mobile and O2dsl instances """
+
+    def __init__(self, size=2, idle_timeout=300, debug=False):
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.debug = debug
+        self.lock = threading.Lock()
+        # key -> list of (driver, timestamp of release)
+        self.idle = {}
 
-        WebDriverWait(driver, timeout).until(element_not_present)
+    def __enter__(self):
+        """ Makes DriverPool a Context Manager """
+        return self
+
+    def __exit__(self, *args):
+        """ quit all pooled drivers at the end of the context """
+        self.close()
+
+    def _quit(self, driver):
+        """ quit a driver including leftover browser processes """
+        drivers.quit(driver)
+
+    def _clear_page(self, driver):
+        """ delete cookies and storage of the origin currently loaded """
+        try:
+            driver.execute_script('window.localStorage.clear(); window.sessionStorage.clear();')
+        except selenium_exceptions.WebDriverException:
+            # storage not accessible on the current page
+            pass
+        driver.delete_all_cookies()
+
+    def _reset(self, driver, origins=()):
+        """ reset browser state so that the driver can be used for a different account
+            args:
+                driver  - selenium driver object
+                origins - origins used by the session (cookies and storage of all of them get cleared)
+            returns:
+                True - in case the reset was successful and no cookies are left
+                False - in case the driver is not usable anymore
+        """
+        origins = sorted(set(url_origin(url) for url in origins))
+        try:
+            # close extra windows
+            handles = driver.window_handles
+            for handle in handles[1:]:
+                driver.switch_to.window(handle)
+                driver.close()
+            driver.switch_to.window(handles[0])
+            self._clear_page(driver)
+            if hasattr(driver, 'execute_cdp_cmd'):
+                # chrome: clear all domains without loading them
+                driver.execute_cdp_cmd('Network.clearBrowserCookies', {})
+                for origin in origins:
+                    driver.execute_cdp_cmd('Storage.clearDataForOrigin', {'origin': origin, 'storageTypes': 'all'})
+                remaining = driver.execute_cdp_cmd('Network.getAllCookies', {}).get('cookies', [])
+            else:
+                # cookies and storage can only be cleared for the origin currently loaded (sso cookies live on the login host)
+                remaining = []
+                for origin in origins:
+                    driver.get(origin + '/robots.txt')
+                    self._clear_page(driver)
+                    remaining.extend(driver.get_cookies())
+            driver.get('about:blank')
+        except selenium_exceptions.WebDriverException as err:
+            print_debug(self.debug, 'DriverPool._reset() failed: {0}'.format(err))
+            return False
+        if remaining:
+            # never hand out a browser which may still be authenticated
+            print_debug(self.debug, 'DriverPool._reset(): cookies left on {0}'.format(sorted(set(cookie.get('domain') for cookie in remaining))))
+            return False
         return True
-    except TimeoutException:
-        print("Timed out waiting for element to disappear")
-        return False
+
+    def acquire(self, key, factory):
+        """ borrow a driver from the pool
+
+            args:
+                key     - pool key (drivers are only shared between identical keys)
+                factory - function creating a new driver in case there is no idle one
+
+            returns:
+                selenium driver object
+        """
+        self.evict()
+        with self.lock:
+            idle_list = self.idle.get(key, [])
+            driver = idle_list.pop()[0] if idle_list else None
+        reason = drivers.expired(driver) if driver else None
+        if reason:
+            print_debug(self.debug, 'DriverPool.acquire({0}): recycle driver ({1})'.format(key, reason))
+            drivers.recycled(reason)
+            self._quit(driver)
+            driver = None
+        if driver:
+            print_debug(self.debug, 'DriverPool.acquire({0}): reuse warm driver'.format(key))
+        else:
+            print_debug(self.debug, 'DriverPool.acquire({0}): start new driver'.format(key))
+            driver = factory()
+        return driver
+
+    def release(self, key, driver, origins=()):
+        """ return a driver to the pool
+
+            args:
+                key     - pool key used in acquire()
+                driver  - selenium driver object
+                origins - urls of the portals used with the driver (e.g. login and ecare host)
+        """
+        print_debug(self.debug, 'DriverPool.release({0})'.format(key))
+        reason = drivers.expired(driver)
+        if reason:
+            # memory, age or operation limit reached
+            print_debug(self.debug, 'DriverPool.release({0}): recycle driver ({1})'.format(key, reason))
+            drivers.recycled(reason)
+            self._quit(driver)
+            return
+        if not self._reset(driver, origins):
+            self._quit(driver)
+            return
+        with self.lock:
+            idle_list = self.idle.setdefault(key, [])
+            if sum(len(entries) for entries in self.idle.values()) < self.size:
+                idle_list.append((driver, time.time()))
+                driver = None
+        if driver:
+            # pool is full
+            self._quit(driver)
+
+    def evict(self):
+        """ quit drivers being idle for longer than idle_timeout """
+        expired = []
+        limit = time.time() - self.idle_timeout
+        with self.lock:
+            for key in self.idle:
+                expired.extend(driver for (driver, released) in self.idle[key] if released < limit)
+                self.idle[key] = [entry for entry in self.idle[key] if entry[1] >= limit]
+        for driver in expired:
+            print_debug(self.debug, 'DriverPool.evict(): quit idle driver')
+            self._quit(driver)
+
+    def close(self):
+        """ quit all idle drivers """
+        with self.lock:
+            idle = [driver for entries in self.idle.values() for (driver, _released) in entries]
+            self.idle = {}
+        for driver in idle:
+            self._quit(driver)
 
 class O2mobile(object):
     """ class to fetch information from mobile accounts """
     base_url = 'https://www.o2online.de'
+    login_url = 'https://login.o2online.de/auth/login'
+    # hosts blocked and never blocked in lean mode
+    lean_deny_hosts = [
+        'doubleclick.net', 'googlesyndication.com', 'googleadservices.com', 'google-analytics.com',
+        'googletagmanager.com', 'tiqcdn.com', 'tealiumiq.com', 'facebook.net', 'facebook.com',
+        'criteo.com', 'criteo.net', 'adform.net', 'adnxs.com', 'bing.com', 'hotjar.com',
+        'mouseflow.com', 'nr-data.net', 'optimizely.com', 'outbrain.com', 'taboola.com',
+        'xplosion.de', 'emetriq.de', 'webtrekk.net', 'wt-safetag.com', 'kameleoon.eu',
+    ]
+    lean_allow_hosts = ['o2online.de']
+    # url patterns blocked by chrome in lean mode
+    lean_deny_urls = ['*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.svg', '*.ico', '*.woff', '*.woff2', '*.ttf', '*.otf', '*.mp4', '*.webm']
+    # ecare pages fetched by the http fastpath (relative to base_url)
+    ecare_pages = {
+        'usage': '/ecare/verbrauch',
+        'bills': '/ecare/rechnung',
+        'numbers': '/ecare/',
+    }
+    # link texts of the portal views (in order of preference)
+    usage_views = ('Verbrauch', 'Mein O2 Übersicht')
+    plan_views = ('Tarif und Vertrag', 'Tarif & SIM-Karte')
+    # popups covering the portal pages: element and element type to wait for, xpath of the button closing it
+    # (the link to the usage page is clicked the same way once it shows up during the login)
+    popups = {
+        'cookies': ('uc-btn-accept-banner', 'id', '//*[@id="uc-btn-accept-banner"]'),
+        'optin': ('optinAcceptButton', 'id', '//*[@id="optinAcceptButton"]'),
+        'modal': ('modal-content', 'classpresent', '//div[@class="modal-header"]//button[@data-tracking-description="cms___close"]'),
+        'ads': (u'Schließen', 'button', u'//button[@data-tracking-description="cms___Schließen"]'),
+        'usage-link': ('Verbrauch', 'a', '//a[text()="Verbrauch"]'),
+    }
     user = None
     pwd = None
     driver = None
+    session = None
+    navigation = None
+    # set once the object has been torn down (no recovery afterwards)
+    cancelled = False
+    # time to wait for the profile of the account if another browser uses it (None: ProfileManager default)
+    profile_timeout = None
     debug = False
 
-    def __init__(self, user=None, pwd=None, debug=False, headless=True, browser='firefox'):
+    def __init__(self, user=None, pwd=None, debug=False, headless=True, browser='firefox', fastpath=False, session_dir=None, pool=None, parser='lxml', base_url=None, login_url=None, diagnostics=None, lean=False, deny_hosts=None, allow_hosts=None, cache=None, capture=False, retry=None, profiles=None):
         self.user = user
         self.pwd = pwd
         self.debug = debug
         self.headless = headless
         self.browser = browser.lower()
+        self.fastpath = fastpath
+        self.session_dir = session_dir
+        self.pool = pool
+        self.parser = parsers.get_parser(parser)
+        if base_url:
+            self.base_url = base_url
+        if login_url:
+            self.login_url = login_url
+        self.diagnostics = diagnostics
+        self.lean = lean
+        self.cache = cache
+        self.capture = NetworkCapture(debug=debug) if capture else None
+        self.retry = retry or RetryPolicy()
+        self.breaker = get_breaker(('mobile', user))
+        self.profiles = profiles
+        self.profile = None
+        if deny_hosts is not None:
+            self.lean_deny_hosts = deny_hosts
+        if allow_hosts is not None:
+            self.lean_allow_hosts = allow_hosts
 
     def __enter__(self):
-        """ Makes O2Mobile a Context Manager """
-        if not self.driver:
+        """ Makes O2Mobile a Context Manager (with a cache the login is deferred to the first cache miss) """
+        if not self.cache:
+            self._ensure_session()
+        return self
+
+    def _ensure_session(self):
+        """ start the browser and login unless this has been done already """
+        if self.driver:
+            return
+        if self.cancelled:
+            raise SessionClosed('browser has been shut down')
+        try:
+            self._retry('login', self._start_session)
+            if self.cancelled:
+                # the session has been torn down while the login was running
+                raise SessionClosed('browser has been shut down')
+        except BaseException:
+            if self.driver:
+                self._close_instance()
+            raise
+
+    def _start_session(self):
+        """ restore a stored session or login """
+        if self.driver:
+            # a previous attempt failed after the browser had been started
+            self._login()
+        elif self._restore_session():
+            print_debug(self.debug, 'self._restore_session() done')
+        else:
             self._login()
             print_debug(self.debug, 'self._login() done')
-        return self
+
+    def _retry(self, name, func, *args):
+        """ run an operation with retries, recovery of the driver in between and the circuit breaker of the account
+            args:
+                name - name of the operation
+                func - method to be called
+            returns:
+                result of the method
+        """
+        retryable = RETRYABLE + (selenium_exceptions.WebDriverException, requests.exceptions.RequestException)
+        recover = self._recover if name != 'login' else None
+
+        def _run():
+            if self.cancelled:
+                raise SessionClosed('{0} cancelled'.format(name))
+            if self.driver:
+                reason = drivers.expired(self.driver)
+                if reason:
+                    self._recycle(reason)
+                drivers.touch(self.driver)
+            return func(*args)
+        return retry_call(_run, self.retry, self.breaker, name='{0} {1}'.format(self.user, name), retryable=retryable, recover=recover, log=lambda text: print_debug(self.debug, text))
+
+    @traced('mobile.recycle')
+    def _recycle(self, reason):
+        """ replace the browser once it reached the limits in driver_config; the session is handed over via cookies
+            args:
+                reason - limit which has been reached (rss, age or ops)
+        """
+        print_debug(self.debug, 'O2mobile._recycle({0})'.format(reason))
+        cookies = self.driver.get_cookies()
+        if not self.pool or self.profile:
+            # pooled drivers get counted by the pool
+            drivers.recycled(reason)
+        self._close_instance()
+        self.driver = self._new_instance()
+        if not self._attach_session(cookies):
+            self._login()
+
+    @traced('mobile.recover')
+    def _recover(self):
+        """ bring the driver back into a usable state after a failed step: reload the portal and
+            re-authenticate if the session is gone. The browser is only restarted if it does not respond.
+        """
+        print_debug(self.debug, 'O2mobile._recover()')
+        if self.cancelled or not self.driver:
+            # torn down on purpose: do not start a new browser
+            raise SessionClosed('browser has been shut down')
+        self.navigation = None
+        if self.session:
+            self.session.close()
+            self.session = None
+        url = self.base_url + self.ecare_pages['usage']
+        try:
+            with tracer.span('page.load', url=url):
+                self.driver.get(url)
+        except selenium_exceptions.TimeoutException:
+            # portal is slow but the browser works
+            pass
+        except selenium_exceptions.WebDriverException as err:
+            print_debug(self.debug, 'browser does not respond ({0}), restarting'.format(err))
+            self._close_instance()
+            self.driver = self._new_instance()
+        if self.driver.current_url.startswith(self.login_url) or not wait_for_element(self.driver, self.debug, 'usage-status-summary', 'class', 10):
+            self._login()
 
     def __exit__(self, *args):
         """ Close the connection at the end of the context """
         print_debug(self.debug, 'we are in __exit__')
         self.logout()
 
+    @traced('mobile.attach_session')
+    def _attach_session(self, cookies):
+        """ load the cookies of an authenticated session into the driver
+            args:
+                cookies - list of cookies as returned by driver.get_cookies()
+            returns:
+                True - in case the session is valid
+                False - in case the portal redirected to the login page
+        """
+        print_debug(self.debug, 'O2mobile._attach_session()')
+        for url in (self.login_url, self.base_url + self.ecare_pages['usage']):
+            # cookies can only be set for the domain currently loaded
+            with tracer.span('page.load', url=url):
+                self.driver.get(url)
+            restore_cookies(self.driver, cookies)
+
+        with tracer.span('page.load', url=self.base_url + self.ecare_pages['usage']):
+            self.driver.get(self.base_url + self.ecare_pages['usage'])
+        if not self.driver.current_url.startswith(self.login_url) and self._clear_popups(('ads',), 'usage-status-summary', 'class', 5):
+            return True
+        return False
+
+    @traced('mobile.auth')
     def _auth(self):
         """ authenticates towards an o2 portal by using a user password combination """
         print_debug(self.debug, 'O2mobile._auth()')
-        if self.debug:
-            self.driver.save_screenshot('01-auth-in.png')
+        self._screenshot('01-auth-in')
         if wait_for_element(self.driver, self.debug, 'IDToken1', 'id', 15):
             try:
                 username = self.driver.find_element_by_id("IDToken1")
@@ -135,71 +732,158 @@ class O2mobile(object):
                 password.send_keys(self.pwd)
                 btns = self.driver.find_element_by_xpath("//*[contains(text(), 'Einloggen')]")
                 btns.click()
-                if self.debug:
-                    self.driver.save_screenshot('02-auth-after-login.png')
-            except NoSuchElementException:
-                if self.debug:
-                    self.driver.save_screenshot('02-auth-exception.png')
+                self._screenshot('02-auth-after-login')
+            except selenium_exceptions.NoSuchElementException:
+                self._screenshot('02-auth-exception', failed=True)
         print_debug(self.debug, 'O2mobile._auth() done')
 
-    def _catch_modal_content(self):
-        """ catch ads """
-        print_debug(self.debug, 'O2mobile._catch_modal_content()')
-        # close message asking to send ads
-        if wait_for_element(self.driver, self.debug, 'modal-content', 'classpresent', 5):
-            print_debug(self.debug, 'found modal-content')
-            btn = self.driver.find_element_by_xpath('//div[@class="modal-header"]//button[@data-tracking-description="cms___close"]')
-            btn.click()
-        print_debug(self.debug, 'O2mobile._catch_modal_content() ended')
-
-    def _catch_ads(self):
-        """ catch ads """
-        print_debug(self.debug, 'O2mobile._catch_ads()')
-
-        # (driver, debug, ele, etype, timeout):
-        if wait_for_element(self.driver, self.debug, 'Schließen', 'button', 15):
-            # time.sleep(3)
-            try:
-                ads = self.driver.find_element_by_xpath('//button[@data-tracking-description="cms___Schließen")]')
-                ads.click()
-                print_debug(self.debug, 'pressed button to close overlay window')
-            except BaseException:
-                print_debug(self.debug, 'pressed button to close overlay window')
-        else:
-            print_debug(self.debug, 'found button schließen but could not press it')
-
-    def _catch_cookies(self):
-        """ catch cookies """
-        print_debug(self.debug, "O2mobile._catch_cookies()")
-        if wait_for_element(self.driver, self.debug, 'uc-btn-accept-banner', 'id', 5):
-            print_debug(self.debug, 'found uc-btn-accept-banner')
-            btn = self.driver.find_element_by_id("uc-btn-accept-banner")
-            btn.click()
-        else:
-            if self.debug:
-                self.driver.save_screenshot('06-cookie.png')
-            print_debug(self.debug, 'cookie message wait done')
-
-        print_debug(self.debug, 'O2mobile,_catch_cookies() ended')
-
-    def _catch_optin(self):
-        """ catch and accept optin """
-        print_debug(self.debug, "O2mobile._catch_optin()")
-        if wait_for_element(self.driver, self.debug, 'optinAcceptButton', 'id', 5):
-            print_debug(self.debug, 'found optinAcceptButton')
-            btn = self.driver.find_element_by_id("optinAcceptButton")
-            btn.click()
-        else:
-            if self.debug:
-                self.driver.save_screenshot('05-optin.png')
-        print_debug(self.debug, 'O2mobile._catch_optin() ended')
+    def _captured(self, section, timeout=None):
+        """ result of a section built from the json response captured from the network
+            returns:
+                result or None in case nothing has been captured (the dom has to be parsed)
+        """
+        if not self.capture:
+            return None
+        result = self.capture.result(self.driver, section, self.base_url, timeout)
+        print_debug(self.debug, '{0} {1} from network capture'.format(section, 'taken' if result else 'not available'))
+        return result
+
+    def _cache_get(self, number, section):
+        """ get a result from the cache (None in case of a miss) """
+        if self.cache:
+            result = self.cache.get(self.user, number, section)
+            print_debug(self.debug, 'cache {0} for {1}:{2}'.format('hit' if result is not None else 'miss', number, section))
+            return result
+        return None
+
+    def _cache_set(self, number, section, value):
+        """ store a result in the cache (empty results are not cached) """
+        if self.cache and value:
+            self.cache.set(self.user, number, section, value)
+
+    @traced('mobile.close_popup')
+    def _close_popup(self, name):
+        """ close a popup by clicking its button (accepted consent dialogs are remembered in the profile)
+            args:
+                name - key in popups
+        """
+        print_debug(self.debug, 'O2mobile._close_popup({0})'.format(name))
+        try:
+            self.driver.find_element_by_xpath(self.popups[name][2]).click()
+        except selenium_exceptions.WebDriverException as err:
+            print_debug(self.debug, 'could not close {0}: {1}'.format(name, err))
+            return
+        if name in ('cookies', 'optin'):
+            self._set_consent(name)
+
+    def _clear_popups(self, names, ele, etype, timeout):
+        """ wait for an element while closing the popups showing up in the meantime:
+            one wait for the element and all popups instead of a timeout per popup which is not shown
+            args:
+                names   - popups to look out for (keys in popups)
+                ele     - element to wait for
+                etype   - element type (see element_condition())
+                timeout - time to wait in seconds (restarted after a popup has been closed,
+                          overridden via wait_config['timeouts'] like wait_for_element())
+            returns:
+                True - in case the element was found
+                False - if timeout kicks in
+        """
+        # consent dialogs accepted in an earlier run are kept in the wait as well: the portal shows them
+        # again once the consent expired, and a popup which is not shown costs no time
+        pending = list(names)
+        while True:
+            # popups first: an element below a popup cannot be used before the popup is closed
+            conditions = [(key, element_condition(*self.popups[key][:2])) for key in pending]
+            found = first_of(self.driver, self.debug, conditions + [('element', element_condition(ele, etype))], timeout, '{0}:{1}'.format(etype, ele))
+            if found in (None, 'element'):
+                return found == 'element'
+            self._close_popup(found)
+            pending.remove(found)
+
+    def _set_consent(self, key):
+        """ remember an accepted consent dialog in the profile """
+        if self.profile:
+            self.profiles.set_state(self.profile, key)
+
+    def _clone(self):
+        """ create a second O2mobile object with its own browser and its own portal session
+            (the selected number is stored in the session, sharing it would let the browsers race)
+            returns:
+                O2mobile object logged in on its own
+        """
+        print_debug(self.debug, 'O2mobile._clone()')
+        clone = O2mobile(self.user, self.pwd, self.debug, self.headless, self.browser, pool=self.pool, parser=self.parser.name, base_url=self.base_url, login_url=self.login_url, diagnostics=self.diagnostics, lean=self.lean, deny_hosts=self.lean_deny_hosts, allow_hosts=self.lean_allow_hosts, cache=self.cache, capture=self.capture is not None, retry=self.retry, profiles=self.profiles)
+        # the profile of the account is in use: start from a copy of the template right away
+        clone.profile_timeout = 0
+        # deep links do not depend on the session
+        clone.navigation = self.navigation
+        # log in right away: a worker whose login fails leaves its numbers to the other workers
+        clone._ensure_session() # pylint: disable=W0212
+        return clone
 
     def _close_instance(self):
         """ closes an existing selenium web driver instance """
         print_debug(self.debug, "O2mobile._close_instance()")
-        self.driver.close()
+        if self.session:
+            self.session.close()
+            self.session = None
+        if self.profile:
+            # quit to let the browser write cache and cookies back into the profile
+            drivers.quit(self.driver)
+            self.profiles.release(self.profile)
+            self.profile = None
+        elif self.pool:
+            self.pool.release(self._pool_key(), self.driver, (self.login_url, self.base_url))
+        else:
+            drivers.quit(self.driver)
+        self.driver = None
         # return None
 
+    def _http_get(self, page):
+        """ fetch an ecare page via the http session
+            args:
+                page - key in ecare_pages
+            returns:
+                html content of the page or None in case of an error
+        """
+        return self._http_url(self.base_url + self.ecare_pages[page])
+
+    @traced('mobile.http_get')
+    def _http_url(self, url):
+        """ fetch an url via the http session
+            returns:
+                html content of the page or None in case of an error
+        """
+        print_debug(self.debug, 'O2mobile._http_url({0})'.format(url))
+        if not self.session:
+            self.session = self._new_session()
+        try:
+            response = self.session.get(url, timeout=15)
+            response.raise_for_status()
+            result = response.text
+        except requests.exceptions.RequestException as err:
+            print_debug(self.debug, 'http fastpath failed: {0}'.format(err))
+            result = None
+        return result
+
+    def _http_parse(self, page, parser):
+        """ fetch a page via http and parse it
+            args:
+                page - key in ecare_pages
+                parser - method used to parse the html
+            returns:
+                parsed result or None in case fetching or parsing failed
+        """
+        result = None
+        html = self._http_get(page)
+        if html:
+            result = parser(html)
+            if not result:
+                print_debug(self.debug, 'http fastpath could not parse {0}, falling back to selenium'.format(page))
+        return result
+
+    @traced('mobile.login')
     def _login(self):
         """ used to login towards an o2-online portal calling the following methods:
                 1. new - to start a new instance
@@ -216,20 +900,20 @@ class O2mobile(object):
                 Otherwise the resturn code will be "False" and an error message get printed on STDOUT
         """
         print_debug(self.debug, "O2mobile._login()")
-        self.driver = self._new_instance()
+        if not self.driver:
+            self.driver = self._new_instance()
         # open page
         try:
             # self.driver.get('https://login.o2online.de/auth/login?goto=https%3A%2F%2Fwww.o2online.de%2Fmein-o2%2F')
-            self.driver.get('https://login.o2online.de/auth/login')
-        except TimeoutException:
-            print('timeout connecting to {0}'.format('https://login.o2online.de/auth/login'))
-            sys.exit(0)
+            with tracer.span('page.load', url=self.login_url):
+                self.driver.get(self.login_url)
+        except selenium_exceptions.TimeoutException as err:
+            raise PortalUnavailable('timeout connecting to {0}'.format(self.login_url)) from err
 
-        if self.debug:
-            self.driver.save_screenshot('00-login.png')
+        self._screenshot('00-login')
 
-        # catch cookie-message
-        self._catch_cookies()
+        # the cookie banner may show up on top of the login form
+        self._clear_popups(('cookies',), 'IDToken1', 'id', 15)
 
         print_debug(self.debug, 'login-site fetched')
         self._auth()
@@ -237,60 +921,61 @@ class O2mobile(object):
         # catch login error
         try:
             error = self.driver.find_element_by_xpath('//div[contains(@class, "alert") and contains(@class, "alert-danger")]').text.strip()
-        except NoSuchElementException:
+        except selenium_exceptions.NoSuchElementException:
             error = None
         print_debug(self.debug, 'login error handling completed')
 
         if error: # pylint: disable=R1705
-            print('Login failed: {0}'.format(error))
+            self._screenshot('03-login-failed', failed=True)
             self._close_instance()
-            sys.exit(0)
-            return None
+            raise LoginError('Login failed: {0}'.format(error))
         else:
 
-            # catch and confirm optin
-            self._catch_optin()
-
-            # optout from mailings
-            self._catch_modal_content()
-
-            try:
-                link = self.driver.find_element_by_link_text('Verbrauch')
-                link.click()
-                print_debug(self.debug, 'Verbrauch click')
-            except BaseException:
-                print_debug(self.debug, 'Verbrauch failed')
-
-            if self.debug:
-                self.driver.save_screenshot('07-mv.png')
-
-            if wait_for_element(self.driver, self.debug, 'usage-status-summary', 'class', 15): # pylint: disable=R1705
+            # close optin, mailing and ad popups and switch to the usage page while waiting for the usage summary
+            if self._clear_popups(('cookies', 'optin', 'modal', 'ads', 'usage-link'), 'usage-status-summary', 'class', 15): # pylint: disable=R1705
                 print_debug(self.debug, 'usage-status-summary')
-                if self.debug:
-                    self.driver.save_screenshot('08-user-status-summary-succ.png')
-
-                # get rid of this f**** advertisement pop-ups
-                self._catch_ads()
-
-                if self.debug:
-                    self.driver.save_screenshot('09-end-login.png')
+                self._screenshot('08-user-status-summary-succ')
+                self._screenshot('09-end-login')
+                if self.session_dir:
+                    save_session(self.session_dir, self.user, self.driver.get_cookies())
                 print_debug(self.debug, 'we will return true now')
                 return True
             else:
                 print_debug(self.debug, 'usage-status-summary NOT found')
-                self.driver.save_screenshot('08-user-status-summary-failed.png')
-                self._close_instance()
-                sys.exit(0)
-                return False
+                self._screenshot('08-user-status-summary-failed', failed=True)
+                # the driver is kept for another attempt
+                raise PageError('usage-status-summary not found after login')
 
+    @traced('mobile.driver_start')
     def _new_instance(self):
         """ initializes a new selenium web driver instance
         and returns a reference to the browser object for further processing """
         print_debug(self.debug, 'O2mobile._new_instance()')
-        if self.browser == 'chrome':
-            driver = self._new_chrome()
-        else:
-            driver = self._new_firefox()
+        if self.pool and not self.profiles:
+            # browsers with an account profile are not shared
+            return self.pool.acquire(self._pool_key(), self._start_instance)
+        return self._start_instance()
+
+    def _pool_key(self):
+        """ drivers started with the same settings can be shared via the pool """
+        return ('mobile', self.browser, self.headless, self.lean, self.capture is not None)
+
+    def _start_instance(self):
+        """ starts a new browser process """
+        if self.profiles and not self.profile:
+            self.profile = self.profiles.acquire(self.user, self.profile_timeout)
+            print_debug(self.debug, 'using profile {0}'.format(self.profile))
+        try:
+            if self.browser == 'chrome':
+                driver = self._new_chrome()
+            else:
+                driver = self._new_firefox()
+            drivers.register(driver)
+        except BaseException:
+            if self.profile:
+                self.profiles.release(self.profile)
+                self.profile = None
+            raise
         driver.set_window_size(1024, 768)
         driver.set_script_timeout(5)
         return driver
@@ -302,6 +987,27 @@ class O2mobile(object):
         if self.headless:
             print_debug(self.debug, 'activating headless mode')
             options.add_argument('-headless')
+        if self.lean:
+            print_debug(self.debug, 'activating lean mode')
+            options.set_capability('pageLoadStrategy', 'eager')
+            # no images, web fonts and media
+            options.set_preference('permissions.default.image', 2)
+            options.set_preference('gfx.downloadable_fonts.enabled', False)
+            options.set_preference('browser.display.use_document_fonts', 0)
+            options.set_preference('media.autoplay.default', 5)
+            options.set_preference('media.preload.default', 0)
+            options.set_preference('privacy.trackingprotection.enabled', True)
+            # block tracker and ad hosts
+            options.set_preference('network.proxy.type', 2)
+            options.set_preference('network.proxy.autoconfig_url', pac_url(self.lean_deny_hosts, self.lean_allow_hosts))
+        if self.profile:
+            # use the profile in place (FirefoxProfile would work on a temporary copy)
+            options.add_argument('-profile')
+            options.add_argument(self.profile)
+            options.set_preference('browser.cache.disk.enable', True)
+            options.set_preference('browser.cache.disk.parent_directory', self.profile)
+        if self.capture:
+            print_debug(self.debug, 'network capture is only supported by chrome, using the dom')
         driver = webdriver.Firefox(firefox_options=options)
         return driver
 
@@ -313,9 +1019,89 @@ class O2mobile(object):
             print_debug(self.debug, 'activating headless mode')
             options.add_argument('-headless')
         options.add_argument('--no-sandbox')
+        if self.profile:
+            options.add_argument('--user-data-dir={0}'.format(self.profile))
+        if self.lean:
+            print_debug(self.debug, 'activating lean mode')
+            options.set_capability('pageLoadStrategy', 'eager')
+            options.add_argument('--blink-settings=imagesEnabled=false')
+            options.add_argument('--autoplay-policy=user-gesture-required')
+            options.add_argument('--proxy-pac-url={0}'.format(pac_url(self.lean_deny_hosts, self.lean_allow_hosts)))
+            options.add_experimental_option('prefs', {'profile.managed_default_content_settings.images': 2})
+        if self.capture:
+            # json responses get collected from the performance log
+            options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
         driver = webdriver.Chrome(chrome_options=options)
+        if self.lean:
+            try:
+                driver.execute_cdp_cmd('Network.enable', {})
+                driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': self.lean_deny_urls})
+            except (AttributeError, selenium_exceptions.WebDriverException):
+                print_debug(self.debug, 'request interception not supported by driver')
         return driver
 
+    def _new_session(self, pool_size=4):
+        """ creates a pooled http session carrying the cookies of the authenticated browser session """
+        print_debug(self.debug, 'O2mobile._new_session()')
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers.update({'User-Agent': self.driver.execute_script('return navigator.userAgent;')})
+        for cookie in self.driver.get_cookies():
+            session.cookies.set(cookie['name'], cookie['value'], domain=cookie.get('domain'), path=cookie.get('path', '/'))
+        return session
+
+    @traced('mobile.restore_session')
+    def _restore_session(self):
+        """ restore a stored session instead of running the login sequence
+            returns:
+                True - in case the stored session is still valid
+                False - in case there is no stored session or it expired
+        """
+        print_debug(self.debug, 'O2mobile._restore_session()')
+        if not self.session_dir:
+            return False
+        cookies = load_session(self.session_dir, self.user)
+        if not cookies:
+            return False
+
+        self.driver = self._new_instance()
+        if self._attach_session(cookies):
+            print_debug(self.debug, 'stored session is valid')
+            return True
+
+        print_debug(self.debug, 'stored session expired')
+        self.driver.delete_all_cookies()
+        return False
+
+    def _screenshot(self, name, failed=False):
+        """ record the state of a step
+            args:
+                name   - name of the step
+                failed - True in case the step failed
+        """
+        if self.diagnostics:
+            # only failures get rendered; all other steps are kept in the ring buffer
+            if failed:
+                self.diagnostics.failure(self.driver, self.user, name)
+            else:
+                self.diagnostics.checkpoint(self.driver, self.user, name)
+        elif self.debug:
+            self.driver.save_screenshot('{0}.png'.format(name))
+
+    def _bill_file(self, bill):
+        """ file name of a bill derived from its date and amount """
+        amount = re.sub(r'[^0-9,.-]', '', bill['price']).replace(',', '.')
+        match = re.search(r'(\d{2})\.(\d{2})\.(\d{2,4})', bill['text'])
+        if match:
+            (day, month, year) = match.groups()
+            name = '{0}-{1}-{2}'.format(year if len(year) == 4 else '20' + year, month, day)
+        else:
+            name = re.sub(r'[^A-Za-z0-9.-]+', '_', bill['text'])
+        return 'o2-bill-{0}-{1}.pdf'.format(name, amount)
+
+    @traced('mobile.switch_number')
     def _switch_number(self, number):
         """ switch to a different phone number in o2 web portal
             args:
@@ -325,23 +1111,23 @@ class O2mobile(object):
                 False - in case switch failed
         """
         print_debug(self.debug, 'O2mobile._switch_number({0})'.format(number))
+        if self.capture:
+            self.capture.mark(self.driver)
         ele = self.driver.find_element_by_class_name('side-nav-contract-choice-link')
         ele.click()
         print_debug(self.debug, 'side-nav-contract-choice-link clicked')
         if wait_for_element(self.driver, self.debug, 'side-nav-contract-choice-menu-items', 'class', 15):
             print_debug(self.debug, 'found side-nav-contract-choice-menu-items')
-            # try:
-            time.sleep(1)
-            ele = self.driver.find_element_by_xpath("//span[contains(text(), '%s')]" % number)
-            if self.debug:
-                self.driver.save_screenshot('09-swnum.png')
+            # wait for the menu animation to finish
+            number_xpath = "//span[contains(text(), '%s')]" % number
+            wait_until(self.driver, self.debug, EC.element_to_be_clickable((By.XPATH, number_xpath)), 5, 'number-entry')
+            ele = self.driver.find_element_by_xpath(number_xpath)
+            self._screenshot('09-swnum')
             ele.click()
             print_debug(self.debug, 'found list-entry for number: {0}'.format(number))
 
             # get rid of this f**** advertisement pop-ups
-            self._catch_ads()
-
-            if wait_for_element(self.driver, self.debug, 'usage-info', 'class', 15): # pylint: disable=R1705
+            if self._clear_popups(('ads',), 'usage-info', 'class', 15): # pylint: disable=R1705
                 print_debug(self.debug, 'found usage-info')
                 return True
             else:
@@ -350,236 +1136,605 @@ class O2mobile(object):
         else:
             return False
 
+    @traced('mobile.tarif_und_sim')
     def _tarif_und_sim(self):
         """ tarif & sim-karte parsing """
         print_debug(self.debug, 'O2mobile._tarif_und_sim()')
+        plandata_dic = self._captured('tariff')
+        if plandata_dic:
+            return plandata_dic
         plandata_dic = {}
 
         if wait_for_element(self.driver, self.debug, 'tarifinfo', 'class', 15):
-            soup = BeautifulSoup(self.driver.find_element_by_class_name('tarifinfo').get_attribute('innerHTML'), 'lxml')
-
-            plandata_dic['tariff'] = soup.find('h2', attrs={'class':'h2 highlight'},).text.strip()
-            print_debug(self.debug, 'plan-data tariff found: {0}'.format(plandata_dic['tariff']))
-            try:
-                plandata_dic['price'] = soup.find('div', attrs={'class':'price-single'},).text.strip()
-                print_debug(self.debug, 'plan-data price found: {0}'.format(plandata_dic['price']))
-            except AttributeError:
-                print_debug(self.debug, 'plan-data price exception')
-
-            dlitem = soup.find("dl")
-            keys = dlitem.findAll('dt')
-            values = dlitem.findAll('dd')
-
-            cnt = 0
-            for key in keys:
-                plandata_dic[key.text.strip()] = values[cnt].text.strip()
-                print_debug(self.debug, 'plan-data {0} found: {1}'.format(key.text.strip(), values[cnt].text.strip()))
-                cnt += 1
+            plandata_dic = self.parser.tariff_sim(self.driver.find_element_by_class_name('tarifinfo').get_attribute('innerHTML'))
+            print_debug(self.debug, 'plan-data found: {0}'.format(plandata_dic))
 
         return plandata_dic
 
+    @traced('mobile.tarif_und_vertrag')
     def _tarif_und_vertrag(self):
         """ tarif und vertrag section parsing """
         print_debug(self.debug, 'O2mobile._tarif_und_vertrag()')
+        plandata_dic = self._captured('tariff')
+        if plandata_dic:
+            return plandata_dic
         plandata_dic = {}
 
         if wait_for_element(self.driver, self.debug, 'composition', 'class', 15):
             print_debug(self.debug, 'item-collection')
-            if self.debug:
-                self.driver.save_screenshot('11-item-collection.png')
+            self._screenshot('11-item-collection')
 
             try:
                 link = self.driver.find_element_by_link_text('Mehr')
                 link.click()
                 print_debug(self.debug, 'Tarif und Vertrag Mehr click')
-            except BaseException:
+            except selenium_exceptions.WebDriverException:
                 print_debug(self.debug, 'Tarif und Vertrag Mehr failed')
 
-            soup = BeautifulSoup(self.driver.find_element_by_tag_name('tariff-details').get_attribute('innerHTML'), 'lxml')
-            spans = soup.findAll('span')
-            try:
-                plandata_dic['tariff'] = spans[0].text.strip()
-                print_debug(self.debug, 'plan-data tariff found: {0}'.format(plandata_dic['tariff']))
-            except BaseException:
-                plandata_dic['tariff'] = 'unknown'
-                print_debug(self.debug, 'plan-data tariff exception')
-            try:
-                plandata_dic['price'] = spans[1].text.strip() + ' ' + spans[2].text.strip()
-                print_debug(self.debug, 'plan-data price found: {0}'.format(plandata_dic['price']))
-            except BaseException:
-                plandata_dic['price'] = 'unknown'
-                print_debug(self.debug, 'plan-data price exception')
-
-            items = soup.findAll('div', attrs={'class':'panel-dual-column-list-row bordered-row'})
-            for item in items:
-                values = item.findAll('p')
-                try:
-                    plandata_dic[values[0].text.strip()] = values[1].text.strip()
-                    print_debug(self.debug, 'plan-data {0} found: {1}'.format(values[0].text.strip(), values[1].text.strip()))
-                except BaseException:
-                    pass
+            plandata_dic = self.parser.tariff_contract(self.driver.find_element_by_tag_name('tariff-details').get_attribute('innerHTML'))
+            print_debug(self.debug, 'plan-data found: {0}'.format(plandata_dic))
 
         return plandata_dic
 
+    @traced('mobile.get_bills')
     def get_bills(self):
         """ get list of bills per month """
         print_debug(self.debug, "O2mobile.get_bills()")
+        # not cached: the download links are only valid within the portal session
+        self._ensure_session()
+        return self._retry('get_bills', self._get_bills)
+
+    def _download(self, url, fname):
+        """ stream a document to disk via the http session
+            args:
+                url   - download url
+                fname - target file
+            returns:
+                True - in case the download was successful
+                False - in case of an error
+        """
+        print_debug(self.debug, 'O2mobile._download({0})'.format(fname))
+        try:
+            with tracer.span('bill.download', file=fname):
+                response = self.session.get(url, stream=True, timeout=60)
+                response.raise_for_status()
+                if response.headers.get('Content-Type', '').startswith('text/html'):
+                    # session expired and we got redirected to a portal page
+                    print_debug(self.debug, 'download of {0} returned html'.format(fname))
+                    response.close()
+                    return False
+                try:
+                    with open(fname + '.part', 'wb') as fh_:
+                        for chunk in response.iter_content(chunk_size=65536):
+                            fh_.write(chunk)
+                except BaseException:
+                    # do not leave a partial download behind
+                    response.close()
+                    if os.path.exists(fname + '.part'):
+                        os.remove(fname + '.part')
+                    raise
+                os.rename(fname + '.part', fname)
+        except (requests.exceptions.RequestException, IOError, OSError) as err:
+            print_debug(self.debug, 'download of {0} failed: {1}'.format(fname, err))
+            return False
+        return True
+
+    def _get_bills(self):
+        """ fetch list of bills from the portal """
+        if self.fastpath:
+            bill_list = self._http_parse('bills', lambda html: self.parser.bills(html, self.base_url))
+            if bill_list:
+                return bill_list
+
+        bill_list = []
+        if self.capture:
+            self.capture.mark(self.driver)
         link = self.driver.find_element_by_link_text('Rechnung')
         link.click()
+        captured = self._captured('bills')
+        if captured:
+            return captured
         if wait_for_element(self.driver, self.debug, 'panel-action', 'class', 35):
-            soup = BeautifulSoup(self.driver.find_element_by_class_name('panel-group-stripped').get_attribute('innerHTML'), 'html5lib')
-            bill_list = []
-            for bill in soup.findAll('div', attrs={'class':'panel panel-action'},):
-                tmp_dict = {}
-                tmp_dict['price'] = bill.find('div', attrs={'class': 'price-single price-single-lg'}).text.strip()
-                tmp_dict['text'] = bill.find('div', attrs={'class': 'text'}).text.strip()
-                tmp_dict['download'] = self.base_url + '/ecare' + bill.find('a')['href'].lstrip('.')
-
-                bill_list.append(tmp_dict)
+            bill_list = self.parser.bills(self.driver.find_element_by_class_name('panel-group-stripped').get_attribute('innerHTML'), self.base_url)
 
         return bill_list
 
+    @traced('mobile.get_data_usage')
     def get_data_usage(self):
         """ get usage data """
         print_debug(self.debug, "O2mobile.get_data_usage()")
+        self._ensure_session()
+        data_dic = self._captured('usage')
+        if data_dic:
+            return data_dic
         data_dic = {}
         if wait_for_element(self.driver, self.debug, 'usage', 'class', 15):
             print_debug(self.debug, 'usage')
-            if self.debug:
-                self.driver.save_screenshot('10-usage.png')
+            self._screenshot('10-usage')
 
             # soup = BeautifulSoup(self.driver.find_element_by_tag_name('usage-monitor').get_attribute('innerHTML'), 'lxml')
-            soup = BeautifulSoup(self.driver.find_element_by_class_name('usage-monitor').get_attribute('innerHTML'), 'lxml')
-
-            # actual data usage
-            usage_info = soup.find('div', attrs={'class':'usage-info'})
-
-            try:
-                usage_value = usage_info.find('div', attrs={'class':'usage-value'}).text.strip()
-                data_dic['current'] = usage_value.replace('\n', ' ')
-            except BaseException:
-                data_dic['current'] = 'unknown'
-
-            try:
-                tmp_usage_max_value = usage_info.find('div', attrs={'class':'usage-max-value'})
-                usage_max_value = tmp_usage_max_value.find('strong').text.strip()
-                # re.sub(r'\s+', ' ', mystring).strip()
-                data_dic['limit'] = re.sub(r'\s+', ' ', usage_max_value).strip()
-            except BaseException:
-                data_dic['limit'] = 'unknown'
-
-            # estimation
-            try:
-                tmp_estimation = soup.find('cms-content', attrs={'cmssnippet':'/snippets/ecare/usage/ng/national-estimated-usage-text'})
-                data_dic['estimation'] = tmp_estimation.find('strong').text.strip()
-            except BaseException:
-                pass
-
-            data_dic['remaining'] = 'unknown'
+            data_dic = self.parser.data_usage(self.driver.find_element_by_class_name('usage-monitor').get_attribute('innerHTML'))
         else:
             print_debug(self.debug, 'usage-status-summary NOT found')
-            if self.debug:
-                self.driver.save_screenshot('10-user-status-summary-failed.png')
+            self._screenshot('10-user-status-summary-failed', failed=True)
         return data_dic
 
+    @traced('mobile.get_numbers')
     def get_numbers(self):
         """ get phone numbers belonging to the contract-choice-link """
         print_debug(self.debug, "O2mobile.get_numbers()")
+        number_dict = self._cache_get(None, 'numbers')
+        if number_dict is not None:
+            return number_dict
+        self._ensure_session()
+        number_dict = self._retry('get_numbers', self._get_numbers)
+        self._cache_set(None, 'numbers', number_dict)
+        return number_dict
+
+    def _get_numbers(self):
+        """ fetch phone numbers from the portal """
+        if self.fastpath:
+            number_dict = self._http_parse('numbers', lambda html: self.parser.numbers(html, full_page=True))
+            if number_dict:
+                return number_dict
+
+        # the numbers get loaded together with the first portal page
+        number_dict = self._captured('numbers', timeout=0)
+        if number_dict:
+            return number_dict
+
         ele = self.driver.find_element_by_class_name('side-nav-contract-choice-link')
         ele.click()
 
-        soup = BeautifulSoup(self.driver.find_element_by_class_name('side-nav-contract-choice-menu-items').get_attribute('innerHTML'), 'html5lib')
+        html = self.driver.find_element_by_class_name('side-nav-contract-choice-menu-items').get_attribute('innerHTML')
 
         ele = self.driver.find_element_by_class_name('side-nav-contract-choice-link')
         ele.click()
 
-        number_dict = {}
-        for llist in soup.findAll('li'):
-            spans = llist.findAll('span')
-            try:
-                number_dict[spans[1].text.strip()] = spans[0].text.strip()
-            except IndexError:
-                pass
-
-        return number_dict
+        return self.parser.numbers(html)
 
+    @traced('mobile.get_overview')
     def get_overview(self, number):
         """ get data consumption and contract details for a given number """
         print_debug(self.debug, 'O2mobile.get_overview({0})'.format(number))
-        wait_for_element(self.driver, self.debug, 'navigation-label', 'class', 15)
-        print_debug(self.debug, 'wait for navigation-label done')
-        result = self._switch_number(number)
-        print_debug(self.debug, 'sleep 2')
-        time.sleep(2)
+        number_dict = self._cached_overview(number)
+        if len(number_dict) == 2:
+            return number_dict
+        self._ensure_session()
+        return self._retry('get_overview', self._get_overview, number)
+
+    def _cached_overview(self, number):
+        """ sections of the overview available in the cache """
         number_dict = {}
-        if result:
+        for (key, section) in (('data-usage', 'usage'), ('plan-data', 'plan-data')):
+            value = self._cache_get(number, section)
+            if value is not None:
+                number_dict[key] = value
+        return number_dict
+
+    def _get_overview(self, number):
+        """ collect data consumption and contract details from the portal """
+        number_dict = self._cached_overview(number)
+        if len(number_dict) == 2:
+            return number_dict
+
+        if 'plan-data' not in number_dict and self.navigation and number in self.navigation['plan']:
+            # plan data rarely changes and is kept for the whole session
+            number_dict['plan-data'] = self.navigation['plan'][number]
+
+        links = self._navigation()
+        if self.capture:
+            # captured responses of a different number are dropped
+            self.capture.number = number
+        fastpath = self.fastpath and number in links['numbers']
+        if fastpath:
+            self._http_overview(links, number, number_dict)
+            if len(number_dict) == 2:
+                self._cache_set(number, 'usage', number_dict['data-usage'])
+                self._cache_set(number, 'plan-data', number_dict['plan-data'])
+                return number_dict
+
+        # the http fastpath switched the number on server side: the page in the browser is outdated
+        result = number in links['numbers'] and self._goto(links['numbers'][number], force=fastpath)
+        if not result:
+            wait_for_element(self.driver, self.debug, 'navigation-label', 'class', 15)
+            print_debug(self.debug, 'wait for navigation-label done')
+            result = self._switch_number(number)
+            wait_for_page(self.driver, self.debug, 10)
+
+        if result and 'data-usage' not in number_dict:
             # usage data
-            try:
-                link = self.driver.find_element_by_link_text('Verbrauch')
-                link.click()
-                number_dict['data-usage'] = self.get_data_usage()
-            except BaseException:
-                print_debug(self.debug, 'Verbrauch NOT found')
-                link = self.driver.find_element_by_link_text('Mein O2 Übersicht')
-                link.click()
-                number_dict['data-usage'] = self.get_data_usage()
+            number_dict['data-usage'] = self._usage_view()
 
+        if result and 'plan-data' not in number_dict:
             # plan data
+            plan_data = self._plan_view()
+            if plan_data is not None:
+                number_dict['plan-data'] = plan_data
+            if plan_data:
+                # an empty result is tried again with the next overview of the number
+                links['plan'][number] = plan_data
+
+        self._cache_set(number, 'usage', number_dict.get('data-usage'))
+        self._cache_set(number, 'plan-data', number_dict.get('plan-data'))
+        return number_dict
+
+    def _http_overview(self, links, number, number_dict):
+        """ http fastpath: switch the number via its deep link and fetch usage and plan data without the browser
+            args:
+                links       - result of _navigation()
+                number      - phone number
+                number_dict - overview to be completed (sections which could not be parsed are left out)
+        """
+        print_debug(self.debug, 'O2mobile._http_overview({0})'.format(number))
+        if self._http_url(links['numbers'][number]) is None:
+            return
+        if 'data-usage' not in number_dict:
+            data_usage = self._http_parse('usage', self.parser.data_usage)
+            if data_usage:
+                number_dict['data-usage'] = data_usage
+        # only the tarif und vertrag view contains the complete tariff details
+        if 'plan-data' not in number_dict and self.plan_views[0] in links['views']:
+            html = self._http_url(links['views'][self.plan_views[0]])
+            plan_data = self.parser.tariff_contract(html, full_page=True) if html else None
+            if plan_data:
+                number_dict['plan-data'] = plan_data
+                links['plan'][number] = plan_data
+            else:
+                print_debug(self.debug, 'http fastpath could not parse the tariff view, falling back to selenium')
+
+    def _navigation(self):
+        """ deep links to the number and portal views (resolved once per session from the portal navigation)
+
+            returns:
+                dictionary with absolute urls per phone number ('numbers') and per link text ('views') and
+                the plan data collected during the session ('plan')
+        """
+        if self.navigation is not None:
+            return self.navigation
+        base = self.driver.current_url
+        links = self.parser.navigation(self.driver.page_source)
+        navigation = {'plan': {}}
+        for key in ('numbers', 'views'):
+            navigation[key] = dict((name, urljoin(base, href)) for (name, href) in links[key].items())
+        print_debug(self.debug, 'deep links: {0} numbers, {1} views'.format(len(navigation['numbers']), len(navigation['views'])))
+        if navigation['numbers'] or navigation['views']:
+            self.navigation = navigation
+        return navigation
+
+    def _goto(self, url, force=False):
+        """ open a deep link (unless already loaded)
+            args:
+                url   - absolute url
+                force - load the page even if the browser shows it already
+            returns:
+                True - in case the page has been loaded
+                False - in case loading the page failed
+        """
+        if self.driver.current_url == url and not force:
+            return True
+        print_debug(self.debug, 'O2mobile._goto({0})'.format(url))
+        if self.capture:
+            self.capture.mark(self.driver)
+        try:
+            with tracer.span('page.load', url=url):
+                self.driver.get(url)
+        except selenium_exceptions.WebDriverException as err:
+            print_debug(self.debug, 'deep link {0} failed: {1}'.format(url, err))
+            return False
+        return True
+
+    def _open_view(self, name):
+        """ open a portal view by its deep link or, if there is none, by clicking the menu entry
+            args:
+                name - link text of the view
+        """
+        views = self._navigation()['views']
+        if name in views and self._goto(views[name]):
+            return
+        if self.capture:
+            self.capture.mark(self.driver)
+        link = self.driver.find_element_by_link_text(name)
+        link.click()
+
+    def _usage_view(self):
+        """ open the usage view of the current number and parse it """
+        try:
+            self._open_view(self.usage_views[0])
+            return self.get_data_usage()
+        except selenium_exceptions.WebDriverException:
+            print_debug(self.debug, '{0} NOT found'.format(self.usage_views[0]))
+        self._open_view(self.usage_views[1])
+        return self.get_data_usage()
+
+    def _plan_view(self):
+        """ open the tariff view of the current number and parse it (the next view is tried if a view
+            is missing or could not be parsed)
+            returns:
+                plan data ({} if no view could be parsed) or None in case no tariff view has been found
+        """
+        plan_data = None
+        for (name, parse) in zip(self.plan_views, (self._tarif_und_vertrag, self._tarif_und_sim)):
             try:
-                link = self.driver.find_element_by_link_text('Tarif und Vertrag')
-                link.click()
-                number_dict['plan-data'] = self._tarif_und_vertrag()
-            except BaseException:
+                self._open_view(name)
+                plan_data = parse()
+            except selenium_exceptions.WebDriverException:
+                print_debug(self.debug, '{0} NOT found'.format(name))
+                continue
+            if plan_data:
+                return plan_data
+            print_debug(self.debug, '{0} without plan data'.format(name))
+        print_debug(self.debug, 'panel-tariff-contract NOT found')
+        self._screenshot('11-panel-tariff-contract-failed', failed=True)
+        return plan_data
+
+    def get_overviews(self, numbers=None, workers=2, return_exceptions=False):
+        """ get data consumption and contract details for several numbers in parallel
+            args:
+                numbers           - list of phone numbers (default: all numbers returned by get_numbers())
+                workers           - number of browser instances used in parallel (each one logs in on its own)
+                return_exceptions - yield the exception of a failed number instead of raising it
+            returns:
+                generator yielding (number, overview) tuples as soon as a number has been processed
+        """
+        print_debug(self.debug, 'O2mobile.get_overviews({0})'.format(workers))
+        if numbers is None:
+            numbers = list(self.get_numbers().keys())
+
+        if workers <= 1 or len(numbers) <= 1:
+            for number in numbers:
                 try:
-                    link = self.driver.find_element_by_link_text('Tarif & SIM-Karte')
-                    link.click()
-                    number_dict['plan-data'] = self._tarif_und_sim()
-                except BaseException:
-                    print_debug(self.debug, 'panel-tariff-contract NOT found')
-                    if self.debug:
-                        self.driver.save_screenshot('11-panel-tariff-contract-failed.png')
-        return number_dict
+                    overview = self.get_overview(number)
+                except Exception as err: # pylint: disable=W0703
+                    if not return_exceptions:
+                        raise
+                    overview = err
+                yield (number, overview)
+            return
+
+        number_queue = queue.Queue()
+        for number in numbers:
+            number_queue.put(number)
+        result_queue = queue.Queue()
+        stop = threading.Event()
+
+        def worker(o2m):
+            """ process numbers from the queue until it is empty """
+            while not stop.is_set():
+                try:
+                    number = number_queue.get_nowait()
+                except queue.Empty:
+                    break
+                try:
+                    result_queue.put((number, o2m.get_overview(number)))
+                except Exception as err: # pylint: disable=W0703
+                    print_debug(self.debug, 'get_overview({0}) failed: {1}'.format(number, err))
+                    result_queue.put((number, err))
+
+        def clone_worker():
+            """ worker running on an own browser instance """
+            try:
+                o2m = self._clone()
+            except Exception as err: # pylint: disable=W0703
+                # the remaining workers take over the numbers
+                print_debug(self.debug, 'O2mobile._clone() failed: {0}'.format(err))
+                return
+            try:
+                worker(o2m)
+            finally:
+                o2m.close()
+
+        # the http fastpath relies on the number selected on server side and can not be used in parallel
+        fastpath = self.fastpath
+        self.fastpath = False
+        threads = [threading.Thread(target=worker, args=(self,))]
+        threads.extend(threading.Thread(target=clone_worker) for _cnt in range(min(workers, len(numbers)) - 1))
+        try:
+            for thread in threads:
+                thread.daemon = True
+                thread.start()
+            for _cnt in range(len(numbers)):
+                (number, overview) = result_queue.get()
+                if isinstance(overview, Exception) and not return_exceptions:
+                    raise overview
+                yield (number, overview)
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+            self.fastpath = fastpath
+
+    def sync_bills(self, target_dir, workers=4):
+        """ download all bills not stored in target_dir so far
+            args:
+                target_dir - directory to store the bills in
+                workers    - number of parallel downloads
+            returns:
+                list of files downloaded
+        """
+        print_debug(self.debug, 'O2mobile.sync_bills({0})'.format(target_dir))
+        if not os.path.isdir(target_dir):
+            os.makedirs(target_dir)
+        index_file = os.path.join(target_dir, '.o2_scrap-bills.json')
+        try:
+            with open(index_file, 'r') as fh_:
+                index = set(json.load(fh_))
+        except (IOError, OSError, ValueError):
+            index = set()
+
+        new_bills = [bill for bill in self.get_bills() if self._bill_file(bill) not in index]
+        print_debug(self.debug, '{0} new bills'.format(len(new_bills)))
+        if not new_bills:
+            return []
+
+        if self.session:
+            self.session.close()
+        self.session = self._new_session(max(4, workers))
+
+        def download(bill):
+            """ download a single bill """
+            fname = self._bill_file(bill)
+            return fname if self._download(bill['download'], os.path.join(target_dir, fname)) else None
+
+        executor = ThreadPoolExecutor(max_workers=workers)
+        try:
+            downloaded = [fname for fname in executor.map(download, new_bills) if fname]
+        finally:
+            executor.shutdown()
+
+        index.update(downloaded)
+        with open(index_file + '.tmp', 'w') as fh_:
+            json.dump(sorted(index), fh_, indent=4)
+        os.rename(index_file + '.tmp', index_file)
+        return [os.path.join(target_dir, fname) for fname in downloaded]
 
+    @traced('mobile.logout')
     def logout(self):
         """ logout method """
         print_debug(self.debug, 'O2mobile.logout()')
-        link = self.driver.find_element_by_link_text('Mein O2')
-        link.click()
-        #ele = self.driver.find_element_by_xpath('//a[@href="https://login.o2online.de/auth/logout"]')
-        #ele.click()
-        print_debug(self.debug, 'looking for logout button')
-        link = self.driver.find_element_by_link_text('Logout')
-        link.click()
-        self._close_instance()
+        if not self.driver:
+            # never logged in (all results came from the cache)
+            return
+        try:
+            if self.session_dir:
+                # keep the session alive on the server for the next run
+                save_session(self.session_dir, self.user, self.driver.get_cookies())
+                return
+            link = self.driver.find_element_by_link_text('Mein O2')
+            link.click()
+            #ele = self.driver.find_element_by_xpath('//a[@href="https://login.o2online.de/auth/logout"]')
+            #ele.click()
+            print_debug(self.debug, 'looking for logout button')
+            link = self.driver.find_element_by_link_text('Logout')
+            link.click()
+        finally:
+            # the browser is shut down even if the logout failed
+            if self.driver:
+                self._close_instance()
+
+    def close(self):
+        """ shut down the browser (or return it to the pool) without logging out """
+        print_debug(self.debug, 'O2mobile.close()')
+        if self.driver:
+            self._close_instance()
 
 class O2dsl(object):
     """ class to fetch information from dsl accounts """
 
     base_url = 'https://dsl.o2online.de/'
+    usage_path = 'selfcare/content/segment/kundencenter/meindslfestnetz/dslverbrauch/'
+    user_agent = 'Mozilla/5.0 (X11; Linux x86_64; rv:115.0) Gecko/20100101 Firefox/115.0'
     user = None
     pwd = None
     driver = None
+    session = None
+    # set once the object has been torn down (no recovery afterwards)
+    cancelled = False
     debug = False
 
-    def __init__(self, user=None, pwd=None, debug=False):
+    def __init__(self, user=None, pwd=None, debug=False, session_dir=None, pool=None, parser='lxml', base_url=None, engine='http', retry=None):
         self.user = user
         self.pwd = pwd
         self.debug = debug
+        self.session_dir = session_dir
+        self.pool = pool
+        self.parser = parsers.get_parser(parser)
+        if engine not in ('http', 'browser'):
+            raise ValueError('unknown engine: {0} (available: browser, http)'.format(engine))
+        self.engine = engine
+        self.retry = retry or RetryPolicy()
+        self.breaker = get_breaker(('dsl', user))
+        if base_url:
+            self.base_url = base_url
 
     def __enter__(self):
         """
         Makes O2dsl a Context Manager
         """
-        if not self.driver:
-            self._login()
+        if (self.engine == 'http' and self.session) or (self.engine != 'http' and self.driver):
+            return self
+        try:
+            self._retry('login', self._start_session)
+        except BaseException:
+            if self.session:
+                self.session.close()
+                self.session = None
+            if self.driver:
+                self._close_instance()
+            raise
         return self
 
+    def _start_session(self):
+        """ restore a stored session or login """
+        if self.engine == 'http':
+            if not self._http_restore_session():
+                self._http_login()
+        elif self.driver:
+            # a previous attempt failed after the browser had been started
+            self._login()
+        elif not self._restore_session():
+            self._login()
+
+    def _retry(self, name, func, *args):
+        """ run an operation with retries, recovery in between and the circuit breaker of the account """
+        retryable = RETRYABLE + (selenium_exceptions.WebDriverException, requests.exceptions.RequestException)
+        recover = self._recover if name != 'login' else None
+
+        def _run():
+            if self.cancelled:
+                raise SessionClosed('{0} cancelled'.format(name))
+            if self.driver:
+                # pooled drivers are recycled by the pool once the limits in driver_config are reached
+                reason = drivers.expired(self.driver) if not self.pool else None
+                if reason:
+                    self._recycle(reason)
+                drivers.touch(self.driver)
+            return func(*args)
+        return retry_call(_run, self.retry, self.breaker, name='{0} {1}'.format(self.user, name), retryable=retryable, recover=recover, log=lambda text: print_debug(self.debug, text))
+
+    @traced('dsl.recycle')
+    def _recycle(self, reason):
+        """ replace the browser once it reached the limits in driver_config; the session is handed over via cookies
+            args:
+                reason - limit which has been reached (rss, age or ops)
+        """
+        print_debug(self.debug, 'O2dsl._recycle({0})'.format(reason))
+        cookies = self.driver.get_cookies()
+        drivers.recycled(reason)
+        self._close_instance()
+        self.driver = self._new_instance()
+        if not self._attach_session(cookies):
+            self._login()
+
+    @traced('dsl.recover')
+    def _recover(self):
+        """ re-authenticate after a failed step; the browser is only restarted if it does not respond """
+        print_debug(self.debug, 'O2dsl._recover()')
+        if self.cancelled:
+            raise SessionClosed('session has been shut down')
+        if self.engine == 'http':
+            if self.session:
+                self.session.close()
+            self._http_login()
+            return
+        if not self.driver:
+            # torn down on purpose: do not start a new browser
+            raise SessionClosed('browser has been shut down')
+        try:
+            self.driver.current_url # pylint: disable=W0104
+        except selenium_exceptions.WebDriverException:
+            # browser does not respond: make sure its processes are gone before starting a new one
+            drivers.quit(self.driver)
+            self.driver = None
+        self._login()
+
     def __exit__(self, *args):
         """
         Close the connection at the end of the context
         """
         self.logout()
 
+    @traced('dsl.auth')
     def _auth(self):
         """ authenticates towards an o2 portal by using a user password combination
 
@@ -597,7 +1752,7 @@ class O2dsl(object):
                 password.send_keys(self.pwd)
                 btns = self.driver.find_element_by_id('loginButton')
                 btns.click()
-            except NoSuchElementException:
+            except selenium_exceptions.NoSuchElementException:
                 pass
 
     def _close_instance(self):
@@ -609,10 +1764,111 @@ class O2dsl(object):
             returns:
                 None
         """
-        if not self.debug:
-            self.driver.close()
+        if self.pool:
+            self.pool.release(('dsl', self.debug), self.driver, (self.base_url,))
+        else:
+            drivers.quit(self.driver)
+        self.driver = None
         # return None
 
+    def _new_session(self):
+        """ creates a pooled http session """
+        print_debug(self.debug, 'O2dsl._new_session()')
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=2)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers.update({'User-Agent': self.user_agent})
+        return session
+
+    def _http_get(self, path):
+        """ fetch a page via the http session
+
+            args:
+                path - path relative to base_url
+
+            returns:
+                tuple (final url, html content of the page)
+        """
+        with tracer.span('page.load', url=self.base_url + path):
+            response = self.session.get(self.base_url + path, timeout=15)
+        response.raise_for_status()
+        return (response.url, response.text)
+
+    @traced('dsl.login')
+    def _http_login(self):
+        """ login by posting the login form via http
+
+            returns:
+                True - in case the login succeeded
+        """
+        print_debug(self.debug, 'O2dsl._http_login()')
+        if self.session:
+            # session of a failed attempt
+            self.session.close()
+        self.session = self._new_session()
+        try:
+            (url, html) = self._http_get('sso/login')
+        except requests.exceptions.RequestException as err:
+            raise PortalUnavailable('error connecting to {0}: {1}'.format(self.base_url + 'sso/login', err)) from err
+
+        (action, fields) = parsers.login_form(html, 'benutzername')
+        if action is None:
+            raise PageError('login form not found')
+        fields.update({'benutzername': self.user, 'passwort': self.pwd})
+        with tracer.span('page.load', url=urljoin(url, action)):
+            response = self.session.post(urljoin(url, action), data=fields, timeout=15)
+        response.raise_for_status()
+
+        # catch login error
+        tree = parsers.parse_html(response.text)
+        if parsers.has_class(tree, 'alert'):
+            raise LoginError('Login failed')
+        if not parsers.has_class(tree, 'usedvolume'):
+            raise PageError('usedvolume not found after login')
+        if self.session_dir:
+            save_session(self.session_dir, self.user, self._http_cookies())
+        return True
+
+    @traced('dsl.restore_session')
+    def _http_restore_session(self):
+        """ restore a stored session into a new http session
+
+            returns:
+                True - in case the stored session is still valid
+                False - in case there is no stored session or it expired
+        """
+        if not self.session_dir:
+            return False
+        cookies = load_session(self.session_dir, self.user)
+        if not cookies:
+            return False
+
+        self.session = self._new_session()
+        for cookie in cookies:
+            self.session.cookies.set(cookie['name'], cookie['value'], domain=cookie.get('domain'), path=cookie.get('path', '/'))
+        try:
+            (_url, html) = self._http_get(self.usage_path)
+        except requests.exceptions.RequestException:
+            html = None
+        if parsers.has_class(html, 'usedvolume'):
+            return True
+
+        self.session.close()
+        self.session = None
+        return False
+
+    def _http_cookies(self):
+        """ cookies of the http session in the format used by save_session() """
+        cookies = []
+        for cookie in self.session.cookies:
+            tmp_dict = {'name': cookie.name, 'value': cookie.value, 'domain': cookie.domain, 'path': cookie.path, 'secure': cookie.secure}
+            if cookie.expires:
+                tmp_dict['expiry'] = cookie.expires
+            cookies.append(tmp_dict)
+        return cookies
+
+    @traced('dsl.get_overview')
     def get_overview(self):
         """ get data consumption
 
@@ -622,43 +1878,26 @@ class O2dsl(object):
         returns:
             usage_dict - dictionary with details
         """
-        self.driver.get(self.base_url + 'selfcare/content/segment/kundencenter/meindslfestnetz/dslverbrauch/')
-
-        if wait_for_element(self.driver, self.debug, 'usageoverview', 'class', 15):
-            soup = BeautifulSoup(self.driver.page_source, 'html5lib')
-            data_dic = {}
-
-            # collect actual usage
-            ublock = soup.find('div', attrs={'class':'datablock usedvolume'},)
-            (used_volume, limit) = ublock.find('div', attrs={'class':'value'},).text.strip().split('/')
-            limit = limit.replace(' GB', '')
+        return self._retry('get_overview', self._get_overview)
 
-            data_dic['used'] = int(used_volume.rstrip(' '))
-            data_dic['limit'] = int(limit.lstrip(' '))
-            data_dic['since'] = ublock.find('div', attrs={'class':'label'},).text.strip()
-            data_dic['remaining'] = ublock.find('div', attrs={'class':'textblock'},).text.strip()
-
-            # collect prognosed usage
-            ublock = soup.find('div', attrs={'class':'datablock prognosedvolume'},)
-            (prognosed_volume, _dummy) = ublock.find('div', attrs={'class':'value'},).text.strip().split('/')
-            data_dic['prognosed'] = int(prognosed_volume.rstrip(' '))
-
-            # create 6 months usage history
-            data_dic['history'] = []
-            ublock = soup.find('div', attrs={'id':'throttleoverview'},)
-            for mlist in ublock.findAll('li'):
-                # build temporary hash to be added to list
-                tmp_dic = {}
-                tmp_dic['usage'] = int(mlist.find('span').text.strip().replace(' GB', ''))
-
-                (from_date, to_date) = mlist.find('div', attrs={'class':'month'},).text.strip().split(' ')
-                tmp_dic['from'] = from_date
-                tmp_dic['to'] = to_date
+    def _get_overview(self):
+        """ fetch and parse the usage page """
+        if self.engine == 'http':
+            (_url, html) = self._http_get(self.usage_path)
+            try:
+                # parsed once: a page without usage overview fails in the parser
+                return self.parser.dsl_overview(html)
+            except (IndexError, AttributeError, ValueError) as err:
+                raise PageError('usageoverview not found') from err
 
-                data_dic['history'].append(tmp_dic)
+        with tracer.span('page.load', url=self.base_url + self.usage_path):
+            self.driver.get(self.base_url + self.usage_path)
 
-        return data_dic
+        if not wait_for_element(self.driver, self.debug, 'usageoverview', 'class', 15):
+            raise PageError('usageoverview not found')
+        return self.parser.dsl_overview(self.driver.page_source)
 
+    @traced('dsl.login')
     def _login(self):
         """ used to login towards an o2-online portal calling the following methods:
 
@@ -669,25 +1908,68 @@ class O2dsl(object):
                 Upon successfull login a reference to a selenium driver object will be returned.
                 Otherwise the resturn code will be "False" and an error message get printed on STDOUT
         """
-        self.driver = self._new_instance()
+        if not self.driver:
+            self.driver = self._new_instance()
         # open page
         try:
-            self.driver.get(self.base_url + 'sso/login')
-        except TimeoutException:
-            print('error connecting to {0}'.format(self.base_url + 'sso/login'))
-            sys.exit(0)
+            with tracer.span('page.load', url=self.base_url + 'sso/login'):
+                self.driver.get(self.base_url + 'sso/login')
+        except selenium_exceptions.TimeoutException as err:
+            raise PortalUnavailable('error connecting to {0}'.format(self.base_url + 'sso/login')) from err
 
         self._auth()
 
         # catch login error
-        try:
-            self.driver.find_element_by_class_name('alert')
-            print('Login failed! Aborting...')
-            sys.exit(0)
+        if self.driver.find_elements_by_class_name('alert'):
+            raise LoginError('Login failed')
+        if not wait_for_element(self.driver, self.debug, 'usedvolume', 'class', 15):
+            raise PageError('usedvolume not found after login')
+        if self.session_dir:
+            save_session(self.session_dir, self.user, self.driver.get_cookies())
+        return True
+
+    @traced('dsl.restore_session')
+    def _restore_session(self):
+        """ restore a stored session instead of running the login sequence
+
+            args:
+                self - self
+
+            returns:
+                True - in case the stored session is still valid
+                False - in case there is no stored session or it expired
+        """
+        if not self.session_dir:
+            return False
+        cookies = load_session(self.session_dir, self.user)
+        if not cookies:
             return False
-        except NoSuchElementException:
-            return wait_for_element(self.driver, self.debug, 'usedvolume', 'class', 15)
 
+        self.driver = self._new_instance()
+        return self._attach_session(cookies)
+
+    def _attach_session(self, cookies):
+        """ load the cookies of an authenticated session into the driver
+
+            args:
+                cookies - list of cookies as returned by driver.get_cookies()
+
+            returns:
+                True - in case the session is valid
+                False - in case the session expired
+        """
+        with tracer.span('page.load', url=self.base_url):
+            self.driver.get(self.base_url)
+        restore_cookies(self.driver, cookies)
+        with tracer.span('page.load', url=self.base_url + self.usage_path):
+            self.driver.get(self.base_url + self.usage_path)
+        if wait_for_element(self.driver, self.debug, 'usedvolume', 'class', 5):
+            return True
+
+        self.driver.delete_all_cookies()
+        return False
+
+    @traced('dsl.logout')
     def logout(self):
         """ logout mothod
 
@@ -696,11 +1978,37 @@ class O2dsl(object):
             returns:
                 none
         """
-        btn = self.driver.find_element_by_class_name('logoutUser')
-        btn.click()
-        self._close_instance()
+        if self.engine == 'http':
+            if not self.session:
+                return
+            try:
+                if self.session_dir:
+                    # keep the session alive on the server for the next run
+                    save_session(self.session_dir, self.user, self._http_cookies())
+                else:
+                    self._http_get('sso/logout')
+            except requests.exceptions.RequestException as err:
+                # the session expires on the server anyway
+                print_debug(self.debug, 'logout failed: {0}'.format(err))
+            finally:
+                # the connections are closed even if the logout failed
+                self.session.close()
+                self.session = None
+            return
+        try:
+            if self.session_dir:
+                # keep the session alive on the server for the next run
+                save_session(self.session_dir, self.user, self.driver.get_cookies())
+                return
+            btn = self.driver.find_element_by_class_name('logoutUser')
+            btn.click()
+        finally:
+            # the browser is shut down even if the logout failed
+            if self.driver:
+                self._close_instance()
 
 
+    @traced('dsl.driver_start')
     def _new_instance(self):
         """ initializes a new selenium web driver instance by using either PhantomJS or Mozilla
             and returns a reference to the browser object for further processing
@@ -711,9 +2019,24 @@ class O2dsl(object):
             returns:
                 None
         """
-        driver = webdriver.PhantomJS()
+        if self.pool:
+            return self.pool.acquire(('dsl', self.debug), self._start_instance)
+        return self._start_instance()
+
+    def _start_instance(self):
+        """ starts a new browser process
+
+            args:
+                self - self
+
+            returns:
+                selenium driver object
+        """
         if self.debug:
             driver = webdriver.Firefox()
+        else:
+            driver = webdriver.PhantomJS()
+        drivers.register(driver)
         driver.set_window_size(1024, 768)
         driver.set_script_timeout(5)
         return driver
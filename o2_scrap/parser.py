@@ -0,0 +1,452 @@
+# -*- coding: utf-8 -*-
+""" html parser backends used to extract data from o2online pages """
+
+from __future__ import print_function
+import re
+import lxml.html
+from lxml import etree
+from .lazy import LazyModule
+from .trace import traced
+
+# only needed by the bs4 backend (the proxy keeps the name of the class)
+BeautifulSoup = LazyModule('bs4', 'BeautifulSoup') # pylint: disable=C0103
+
+def _cls(name):
+    """ xpath predicate matching a class attribute the same way BeautifulSoup does """
+    if ' ' in name:
+        return 'normalize-space(@class)="{0}"'.format(name)
+    return 'contains(concat(" ", normalize-space(@class), " "), " {0} ")'.format(name)
+
+ESTIMATION_SNIPPET = '/snippets/ecare/usage/ng/national-estimated-usage-text'
+WHITESPACE = re.compile(r'\s+')
+
+# precompiled xpath expressions
+XPATH = {
+    'usage_info': etree.XPath('(//div[{0}])[1]'.format(_cls('usage-info'))),
+    'usage_value': etree.XPath('(.//div[{0}])[1]'.format(_cls('usage-value'))),
+    'usage_max_value': etree.XPath('(.//div[{0}])[1]//strong[1]'.format(_cls('usage-max-value'))),
+    'estimation': etree.XPath('(//cms-content[@cmssnippet="{0}"])[1]//strong[1]'.format(ESTIMATION_SNIPPET)),
+    'number_menu': etree.XPath('(//*[{0}])[1]'.format(_cls('side-nav-contract-choice-menu-items'))),
+    'li': etree.XPath('.//li'),
+    'span': etree.XPath('.//span'),
+    'p': etree.XPath('.//p'),
+    'bill': etree.XPath('//div[{0}]'.format(_cls('panel panel-action'))),
+    'bill_price': etree.XPath('(.//div[{0}])[1]'.format(_cls('price-single price-single-lg'))),
+    'bill_text': etree.XPath('(.//div[{0}])[1]'.format(_cls('text'))),
+    'bill_link': etree.XPath('(.//a)[1]/@href'),
+    'tariff_sim_name': etree.XPath('(//h2[{0}])[1]'.format(_cls('h2 highlight'))),
+    'tariff_sim_price': etree.XPath('(//div[{0}])[1]'.format(_cls('price-single'))),
+    'dl': etree.XPath('(//dl)[1]'),
+    'dt': etree.XPath('.//dt'),
+    'dd': etree.XPath('.//dd'),
+    'link': etree.XPath('//a[@href]'),
+    'tariff_details': etree.XPath('(//tariff-details)[1]'),
+    'tariff_row': etree.XPath('.//div[{0}]'.format(_cls('panel-dual-column-list-row bordered-row'))),
+    'dsl_used': etree.XPath('(//div[{0}])[1]'.format(_cls('datablock usedvolume'))),
+    'dsl_prognosed': etree.XPath('(//div[{0}])[1]'.format(_cls('datablock prognosedvolume'))),
+    'dsl_value': etree.XPath('(.//div[{0}])[1]'.format(_cls('value'))),
+    'dsl_label': etree.XPath('(.//div[{0}])[1]'.format(_cls('label'))),
+    'dsl_textblock': etree.XPath('(.//div[{0}])[1]'.format(_cls('textblock'))),
+    'dsl_history': etree.XPath('(//div[@id="throttleoverview"])[1]'),
+    'dsl_month': etree.XPath('(.//div[{0}])[1]'.format(_cls('month'))),
+}
+
+def _first(result):
+    """ first entry of an xpath result or None """
+    return result[0] if result else None
+
+def _text(element):
+    """ stripped text content of an lxml element """
+    return element.text_content().strip()
+
+def _deep_link(href):
+    """ check if a link target can be opened directly """
+    return bool(href) and not href.startswith('#') and not href.lower().startswith('javascript:')
+
+def _dsl_history_entry(usage, month):
+    """ build a dsl history entry """
+    (from_date, to_date) = month.split(' ')
+    return {'usage': int(usage.replace(' GB', '')), 'from': from_date, 'to': to_date}
+
+def parse_html(html):
+    """ parse a page once to run several checks on it
+
+        returns:
+            lxml tree or None for an empty page
+    """
+    if isinstance(html, str):
+        return lxml.html.document_fromstring(html) if html.strip() else None
+    return html
+
+def login_form(html, field):
+    """ find the form containing an input field
+
+        args:
+            html  - html of the login page or result of parse_html()
+            field - name of an input field of the form
+
+        returns:
+            tuple (form action, dictionary of prefilled fields) or (None, {}) in case the form has not been found
+    """
+    tree = parse_html(html) if html is not None else None
+    if tree is None:
+        return (None, {})
+    for form in tree.forms:
+        if field in form.fields:
+            return (form.get('action') or '', dict(form.form_values()))
+    return (None, {})
+
+def has_class(html, name):
+    """ check if an element with a given class exists (html or result of parse_html()) """
+    tree = parse_html(html) if html is not None else None
+    if tree is None:
+        return False
+    return bool(tree.xpath('//*[{0}]'.format(_cls(name))))
+
+class LxmlParser(object):
+    """ parser backend using lxml.html and precompiled xpath expressions """
+    name = 'lxml'
+
+    def _tree(self, html):
+        """ parse html into an lxml tree """
+        if not html or not html.strip():
+            html = '<html></html>'
+        return lxml.html.document_fromstring(html)
+
+    @traced('parse.bills')
+    def bills(self, html, base_url):
+        """ parse list of bills """
+        bill_list = []
+        for bill in XPATH['bill'](self._tree(html)):
+            tmp_dict = {}
+            tmp_dict['price'] = _text(XPATH['bill_price'](bill)[0])
+            tmp_dict['text'] = _text(XPATH['bill_text'](bill)[0])
+            tmp_dict['download'] = base_url + '/ecare' + XPATH['bill_link'](bill)[0].lstrip('.')
+            bill_list.append(tmp_dict)
+        return bill_list
+
+    @traced('parse.data_usage')
+    def data_usage(self, html):
+        """ parse data usage (empty dictionary in case no usage-info has been found) """
+        tree = self._tree(html)
+        data_dic = {}
+
+        usage_info = _first(XPATH['usage_info'](tree))
+        if usage_info is None:
+            return data_dic
+
+        usage_value = _first(XPATH['usage_value'](usage_info))
+        data_dic['current'] = _text(usage_value).replace('\n', ' ') if usage_value is not None else 'unknown'
+
+        usage_max_value = _first(XPATH['usage_max_value'](usage_info))
+        data_dic['limit'] = WHITESPACE.sub(' ', _text(usage_max_value)).strip() if usage_max_value is not None else 'unknown'
+
+        estimation = _first(XPATH['estimation'](tree))
+        if estimation is not None:
+            data_dic['estimation'] = _text(estimation)
+
+        data_dic['remaining'] = 'unknown'
+        return data_dic
+
+    @traced('parse.dsl_overview')
+    def dsl_overview(self, html):
+        """ parse dsl usage overview """
+        tree = self._tree(html)
+        data_dic = {}
+
+        # collect actual usage
+        ublock = XPATH['dsl_used'](tree)[0]
+        (used_volume, limit) = _text(XPATH['dsl_value'](ublock)[0]).split('/')
+        data_dic['used'] = int(used_volume.rstrip(' '))
+        data_dic['limit'] = int(limit.replace(' GB', '').lstrip(' '))
+        data_dic['since'] = _text(XPATH['dsl_label'](ublock)[0])
+        data_dic['remaining'] = _text(XPATH['dsl_textblock'](ublock)[0])
+
+        # collect prognosed usage
+        ublock = XPATH['dsl_prognosed'](tree)[0]
+        data_dic['prognosed'] = int(_text(XPATH['dsl_value'](ublock)[0]).split('/')[0].rstrip(' '))
+
+        # create 6 months usage history
+        data_dic['history'] = []
+        for mlist in XPATH['li'](XPATH['dsl_history'](tree)[0]):
+            data_dic['history'].append(_dsl_history_entry(_text(XPATH['span'](mlist)[0]), _text(XPATH['dsl_month'](mlist)[0])))
+        return data_dic
+
+    @traced('parse.numbers')
+    def numbers(self, html, full_page=False):
+        """ parse phone numbers from the contract-choice menu
+            args:
+                html      - innerHTML of the menu or complete page
+                full_page - html is a complete page and must contain the contract-choice menu
+        """
+        tree = self._tree(html)
+        menu = _first(XPATH['number_menu'](tree))
+        if menu is None:
+            if full_page:
+                return {}
+            menu = tree
+
+        number_dict = {}
+        for llist in XPATH['li'](menu):
+            spans = XPATH['span'](llist)
+            if len(spans) > 1:
+                number_dict[_text(spans[1])] = _text(spans[0])
+        return number_dict
+
+    @traced('parse.navigation')
+    def navigation(self, html):
+        """ parse deep links of the portal navigation
+
+            returns:
+                dictionary with link targets per phone number ('numbers') and per link text ('views')
+        """
+        tree = self._tree(html)
+        links = {'numbers': {}, 'views': {}}
+        menu = _first(XPATH['number_menu'](tree))
+        if menu is not None:
+            for llist in XPATH['li'](menu):
+                spans = XPATH['span'](llist)
+                href = _first(llist.xpath('.//a/@href'))
+                if len(spans) > 1 and _deep_link(href):
+                    links['numbers'][_text(spans[1])] = href
+        for link in XPATH['link'](tree):
+            text = WHITESPACE.sub(' ', _text(link))
+            if text and _deep_link(link.get('href')):
+                links['views'].setdefault(text, link.get('href'))
+        return links
+
+    @traced('parse.tariff_contract')
+    def tariff_contract(self, html, full_page=False):
+        """ parse tarif und vertrag section
+            args:
+                html      - innerHTML of the tariff-details element or complete page
+                full_page - html is a complete page and must contain the tariff-details element
+        """
+        tree = self._tree(html)
+        if full_page:
+            tree = _first(XPATH['tariff_details'](tree))
+            if tree is None:
+                return {}
+        plandata_dic = {}
+        spans = XPATH['span'](tree)
+        plandata_dic['tariff'] = _text(spans[0]) if spans else 'unknown'
+        plandata_dic['price'] = _text(spans[1]) + ' ' + _text(spans[2]) if len(spans) > 2 else 'unknown'
+
+        for item in XPATH['tariff_row'](tree):
+            values = XPATH['p'](item)
+            if len(values) > 1:
+                plandata_dic[_text(values[0])] = _text(values[1])
+        return plandata_dic
+
+    @traced('parse.tariff_sim')
+    def tariff_sim(self, html):
+        """ parse tarif & sim-karte section """
+        tree = self._tree(html)
+        plandata_dic = {}
+        tariff = _first(XPATH['tariff_sim_name'](tree))
+        plandata_dic['tariff'] = _text(tariff) if tariff is not None else 'unknown'
+        price = _first(XPATH['tariff_sim_price'](tree))
+        if price is not None:
+            plandata_dic['price'] = _text(price)
+
+        dlitem = _first(XPATH['dl'](tree))
+        if dlitem is not None:
+            for (key, value) in zip(XPATH['dt'](dlitem), XPATH['dd'](dlitem)):
+                plandata_dic[_text(key)] = _text(value)
+        return plandata_dic
+
+class SoupParser(object):
+    """ parser backend using BeautifulSoup (kept for compatibility) """
+    name = 'bs4'
+
+    @traced('parse.bills')
+    def bills(self, html, base_url):
+        """ parse list of bills """
+        soup = BeautifulSoup(html, 'html5lib')
+        bill_list = []
+        for bill in soup.findAll('div', attrs={'class':'panel panel-action'},):
+            tmp_dict = {}
+            tmp_dict['price'] = bill.find('div', attrs={'class': 'price-single price-single-lg'}).text.strip()
+            tmp_dict['text'] = bill.find('div', attrs={'class': 'text'}).text.strip()
+            tmp_dict['download'] = base_url + '/ecare' + bill.find('a')['href'].lstrip('.')
+
+            bill_list.append(tmp_dict)
+        return bill_list
+
+    @traced('parse.data_usage')
+    def data_usage(self, html):
+        """ parse data usage (empty dictionary in case no usage-info has been found) """
+        soup = BeautifulSoup(html, 'lxml')
+        data_dic = {}
+
+        # actual data usage
+        usage_info = soup.find('div', attrs={'class':'usage-info'})
+        if not usage_info:
+            return data_dic
+
+        try:
+            usage_value = usage_info.find('div', attrs={'class':'usage-value'}).text.strip()
+            data_dic['current'] = usage_value.replace('\n', ' ')
+        except BaseException:
+            data_dic['current'] = 'unknown'
+
+        try:
+            tmp_usage_max_value = usage_info.find('div', attrs={'class':'usage-max-value'})
+            usage_max_value = tmp_usage_max_value.find('strong').text.strip()
+            data_dic['limit'] = WHITESPACE.sub(' ', usage_max_value).strip()
+        except BaseException:
+            data_dic['limit'] = 'unknown'
+
+        # estimation
+        try:
+            tmp_estimation = soup.find('cms-content', attrs={'cmssnippet':ESTIMATION_SNIPPET})
+            data_dic['estimation'] = tmp_estimation.find('strong').text.strip()
+        except BaseException:
+            pass
+
+        data_dic['remaining'] = 'unknown'
+        return data_dic
+
+    @traced('parse.dsl_overview')
+    def dsl_overview(self, html):
+        """ parse dsl usage overview """
+        soup = BeautifulSoup(html, 'html5lib')
+        data_dic = {}
+
+        # collect actual usage
+        ublock = soup.find('div', attrs={'class':'datablock usedvolume'},)
+        (used_volume, limit) = ublock.find('div', attrs={'class':'value'},).text.strip().split('/')
+        limit = limit.replace(' GB', '')
+
+        data_dic['used'] = int(used_volume.rstrip(' '))
+        data_dic['limit'] = int(limit.lstrip(' '))
+        data_dic['since'] = ublock.find('div', attrs={'class':'label'},).text.strip()
+        data_dic['remaining'] = ublock.find('div', attrs={'class':'textblock'},).text.strip()
+
+        # collect prognosed usage
+        ublock = soup.find('div', attrs={'class':'datablock prognosedvolume'},)
+        (prognosed_volume, _dummy) = ublock.find('div', attrs={'class':'value'},).text.strip().split('/')
+        data_dic['prognosed'] = int(prognosed_volume.rstrip(' '))
+
+        # create 6 months usage history
+        data_dic['history'] = []
+        ublock = soup.find('div', attrs={'id':'throttleoverview'},)
+        for mlist in ublock.findAll('li'):
+            data_dic['history'].append(_dsl_history_entry(mlist.find('span').text.strip(), mlist.find('div', attrs={'class':'month'},).text.strip()))
+        return data_dic
+
+    @traced('parse.numbers')
+    def numbers(self, html, full_page=False):
+        """ parse phone numbers from the contract-choice menu
+            args:
+                html      - innerHTML of the menu or complete page
+                full_page - html is a complete page and must contain the contract-choice menu
+        """
+        soup = BeautifulSoup(html, 'html5lib')
+        menu = soup.find(class_='side-nav-contract-choice-menu-items')
+        if not menu:
+            if full_page:
+                return {}
+            menu = soup
+
+        number_dict = {}
+        for llist in menu.findAll('li'):
+            spans = llist.findAll('span')
+            try:
+                number_dict[spans[1].text.strip()] = spans[0].text.strip()
+            except IndexError:
+                pass
+        return number_dict
+
+    @traced('parse.navigation')
+    def navigation(self, html):
+        """ parse deep links of the portal navigation
+
+            returns:
+                dictionary with link targets per phone number ('numbers') and per link text ('views')
+        """
+        soup = BeautifulSoup(html, 'html5lib')
+        links = {'numbers': {}, 'views': {}}
+        menu = soup.find(class_='side-nav-contract-choice-menu-items')
+        if menu:
+            for llist in menu.findAll('li'):
+                spans = llist.findAll('span')
+                link = llist.find('a', href=True)
+                if len(spans) > 1 and link and _deep_link(link['href']):
+                    links['numbers'][spans[1].text.strip()] = link['href']
+        for link in soup.findAll('a', href=True):
+            text = WHITESPACE.sub(' ', link.text).strip()
+            if text and _deep_link(link['href']):
+                links['views'].setdefault(text, link['href'])
+        return links
+
+    @traced('parse.tariff_contract')
+    def tariff_contract(self, html, full_page=False):
+        """ parse tarif und vertrag section
+            args:
+                html      - innerHTML of the tariff-details element or complete page
+                full_page - html is a complete page and must contain the tariff-details element
+        """
+        soup = BeautifulSoup(html, 'lxml')
+        if full_page:
+            soup = soup.find('tariff-details')
+            if not soup:
+                return {}
+        plandata_dic = {}
+        spans = soup.findAll('span')
+        try:
+            plandata_dic['tariff'] = spans[0].text.strip()
+        except IndexError:
+            plandata_dic['tariff'] = 'unknown'
+        try:
+            plandata_dic['price'] = spans[1].text.strip() + ' ' + spans[2].text.strip()
+        except IndexError:
+            plandata_dic['price'] = 'unknown'
+
+        items = soup.findAll('div', attrs={'class':'panel-dual-column-list-row bordered-row'})
+        for item in items:
+            values = item.findAll('p')
+            try:
+                plandata_dic[values[0].text.strip()] = values[1].text.strip()
+            except IndexError:
+                pass
+        return plandata_dic
+
+    @traced('parse.tariff_sim')
+    def tariff_sim(self, html):
+        """ parse tarif & sim-karte section """
+        soup = BeautifulSoup(html, 'lxml')
+        plandata_dic = {}
+        try:
+            plandata_dic['tariff'] = soup.find('h2', attrs={'class':'h2 highlight'},).text.strip()
+        except AttributeError:
+            plandata_dic['tariff'] = 'unknown'
+        try:
+            plandata_dic['price'] = soup.find('div', attrs={'class':'price-single'},).text.strip()
+        except AttributeError:
+            pass
+
+        dlitem = soup.find("dl")
+        if dlitem:
+            for (key, value) in zip(dlitem.findAll('dt'), dlitem.findAll('dd')):
+                plandata_dic[key.text.strip()] = value.text.strip()
+        return plandata_dic
+
+PARSERS = {
+    LxmlParser.name: LxmlParser,
+    SoupParser.name: SoupParser,
+}
+
+def get_parser(name='lxml'):
+    """ get a parser backend by name
+
+        args:
+            name - name of the backend (lxml or bs4)
+
+        returns:
+            parser object
+    """
+    try:
+        return PARSERS[name]()
+    except KeyError as err:
+        raise ValueError('unknown parser backend: {0} (available: {1})'.format(name, ', '.join(sorted(PARSERS)))) from err
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+""" persistent browser profiles per account keeping the http cache and the consent state """
+
+from __future__ import print_function
+import os
+import re
+import json
+import time
+import shutil
+import tempfile
+import threading
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# files of a running browser which must not be copied from a template
+LOCK_FILES = ('lock', '.parentlock', 'parent.lock', 'SingletonLock', 'SingletonCookie', 'SingletonSocket')
+
+STATE_FILE = 'o2_scrap.json'
+
+def _component(name):
+    """ file system safe profile name """
+    return re.sub(r'[^A-Za-z0-9_.@+-]', '_', str(name))
+
+class ProfileManager(object):
+    """ hands out browser profile directories
+
+        args:
+            directory    - directory keeping one persistent profile per account (None: temporary profiles only)
+            template     - read-only profile directory used to seed new and temporary profiles
+            lock_timeout - time (in seconds) to wait for a profile used by another worker before
+                           falling back to a temporary copy of the template
+    """
+
+    def __init__(self, directory=None, template=None, lock_timeout=30):
+        self.directory = directory
+        self.template = template
+        self.lock_timeout = lock_timeout
+        self.lock = threading.Lock()
+        self.locks = {}
+        self.temporary = set()
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory, 0o700)
+
+    def _copy_template(self, path):
+        """ seed a profile directory from the template """
+        if self.template and os.path.isdir(self.template):
+            shutil.copytree(self.template, path, ignore=shutil.ignore_patterns(*LOCK_FILES))
+        else:
+            os.makedirs(path, 0o700)
+
+    def _try_lock(self, lockfile):
+        """ try to lock a profile
+
+            returns:
+                lock handle or None in case the profile is in use
+        """
+        if fcntl:
+            fh_ = open(lockfile, 'a')
+            try:
+                fcntl.flock(fh_.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except (IOError, OSError):
+                fh_.close()
+                return None
+            return fh_
+        # no flock available: lock file created exclusively
+        try:
+            return os.open(lockfile, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except OSError:
+            return None
+
+    def _unlock(self, lockfile, handle):
+        """ release a profile lock """
+        if fcntl:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+            handle.close()
+        else:
+            os.close(handle)
+            os.remove(lockfile)
+
+    def acquire(self, account, timeout=None):
+        """ get the profile of an account for exclusive use
+
+            args:
+                account - account name
+                timeout - time to wait for the profile (default: lock_timeout)
+
+            returns:
+                profile directory (release it via release())
+        """
+        if self.directory:
+            path = os.path.join(self.directory, _component(account))
+            deadline = time.time() + (self.lock_timeout if timeout is None else timeout)
+            while True:
+                handle = self._try_lock(path + '.lock')
+                if handle is not None:
+                    if not os.path.isdir(path):
+                        self._copy_template(path)
+                    with self.lock:
+                        self.locks[path] = handle
+                    return path
+                if time.time() >= deadline:
+                    break
+                time.sleep(0.5)
+
+        # no persistent profile available: temporary copy of the template
+        path = os.path.join(tempfile.mkdtemp(prefix='o2_scrap-'), 'profile')
+        self._copy_template(path)
+        with self.lock:
+            self.temporary.add(path)
+        return path
+
+    def release(self, path):
+        """ give a profile back (temporary profiles get deleted) """
+        with self.lock:
+            handle = self.locks.pop(path, None)
+            temporary = path in self.temporary
+            self.temporary.discard(path)
+        if handle is not None:
+            self._unlock(path + '.lock', handle)
+        elif temporary:
+            shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+
+    def is_temporary(self, path):
+        """ check if a profile will be deleted on release """
+        with self.lock:
+            return path in self.temporary
+
+    def state(self, path):
+        """ consent state stored in a profile (e.g. {'cookies': True, 'optin': True}) """
+        try:
+            with open(os.path.join(path, STATE_FILE), 'r') as fh_:
+                return json.load(fh_)
+        except (IOError, OSError, ValueError):
+            return {}
+
+    def set_state(self, path, key, value=True):
+        """ store a consent flag in a profile """
+        state = self.state(path)
+        state[key] = value
+        with open(os.path.join(path, STATE_FILE) + '.tmp', 'w') as fh_:
+            json.dump(state, fh_)
+        os.rename(os.path.join(path, STATE_FILE) + '.tmp', os.path.join(path, STATE_FILE))
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+""" retry with exponential backoff and per-account circuit breakers """
+
+from __future__ import print_function
+import time
+import random
+import threading
+from .errors import CircuitOpen
+
+class RetryPolicy(object):
+    """ exponential backoff with jitter
+
+        args:
+            attempts  - number of attempts (1 - no retry)
+            base      - delay before the second attempt in seconds
+            factor    - multiplier applied to the delay after every attempt
+            max_delay - upper limit of a delay in seconds
+            jitter    - random share (0..1) of a delay added or removed to spread retries of parallel workers
+    """
+
+    def __init__(self, attempts=3, base=2.0, factor=2.0, max_delay=60.0, jitter=0.5):
+        self.attempts = max(1, attempts)
+        self.base = base
+        self.factor = factor
+        self.max_delay = max_delay
+        self.jitter = jitter
+
+    def delay(self, attempt):
+        """ delay in seconds after a failed attempt (starting with 1) """
+        delay = min(self.base * self.factor ** (attempt - 1), self.max_delay)
+        return max(0.0, delay * (1 + random.uniform(-self.jitter, self.jitter)))
+
+class CircuitBreaker(object):
+    """ opens after threshold consecutive failures and rejects calls for reset_timeout seconds;
+        afterwards a single trial call is let through (half-open)
+    """
+
+    def __init__(self, threshold=5, reset_timeout=600):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.lock = threading.Lock()
+        self.failures = 0
+        self.opened = None
+        # a trial call is running (half-open)
+        self.trial = False
+
+    @property
+    def state(self):
+        """ closed, open or half-open """
+        with self.lock:
+            if self.opened is None:
+                return 'closed'
+            return 'open' if time.time() - self.opened < self.reset_timeout else 'half-open'
+
+    def check(self, name=''):
+        """ raise CircuitOpen as long as the breaker is open; in half-open state only the first caller
+            gets through as trial call until it called release()
+
+            returns:
+                True - the caller got the trial call
+                False - the breaker is closed
+        """
+        with self.lock:
+            if self.opened is None:
+                return False
+            if time.time() - self.opened >= self.reset_timeout and not self.trial:
+                self.trial = True
+                return True
+            failures = self.failures
+        raise CircuitOpen('{0}circuit open after {1} consecutive failures'.format(name + ': ' if name else '', failures))
+
+    def success(self):
+        """ record a successful call """
+        with self.lock:
+            self.failures = 0
+            self.opened = None
+
+    def failure(self):
+        """ record a failed call """
+        with self.lock:
+            self.failures += 1
+            if self.failures >= self.threshold:
+                # (re)open; a failed trial call restarts the timeout
+                self.opened = time.time()
+
+    def release(self):
+        """ end of the trial call: the next caller may be let through once the breaker is half-open again """
+        with self.lock:
+            self.trial = False
+
+# circuit breaker settings
+#   threshold     - consecutive failures opening the breaker of an account
+#   reset_timeout - time (in seconds) calls of an account get rejected
+breaker_config = {
+    'threshold': 5,
+    'reset_timeout': 600,
+}
+
+_BREAKERS = {}
+_LOCK = threading.Lock()
+
+def get_breaker(key):
+    """ circuit breaker of an account (shared by all objects of the process)
+
+        args:
+            key - tuple (portal, user)
+    """
+    with _LOCK:
+        if key not in _BREAKERS:
+            _BREAKERS[key] = CircuitBreaker(breaker_config['threshold'], breaker_config['reset_timeout'])
+        return _BREAKERS[key]
+
+def retry_call(func, policy, breaker=None, name='', retryable=(), recover=None, log=None):
+    """ call a function with retries
+
+        args:
+            func      - function without arguments
+            policy    - RetryPolicy object
+            breaker   - CircuitBreaker object (optional)
+            name      - name of the operation used in messages
+            retryable - exception classes worth another attempt
+            recover   - function called before the next attempt (optional)
+            log       - function receiving messages (optional)
+
+        returns:
+            result of the function
+    """
+    trial = breaker.check(name) if breaker else False
+    try:
+        return _attempts(func, policy, breaker, name, retryable, recover, log)
+    finally:
+        if trial:
+            breaker.release()
+
+def _attempts(func, policy, breaker, name, retryable, recover, log):
+    """ attempts of retry_call() """
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            result = func()
+        except retryable as err:
+            if attempt >= policy.attempts:
+                if breaker:
+                    breaker.failure()
+                raise
+            delay = policy.delay(attempt)
+            if log:
+                log('{0} failed ({1}: {2}), attempt {3}/{4}, retrying in {5:.1f}s'.format(name, type(err).__name__, err, attempt, policy.attempts, delay))
+            time.sleep(delay)
+            if recover:
+                try:
+                    recover()
+                except retryable as rerr:
+                    if log:
+                        log('{0} recovery failed: {1}'.format(name, rerr))
+            continue
+        except Exception:
+            if breaker:
+                breaker.failure()
+            raise
+        if breaker:
+            breaker.success()
+        return result
@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+""" multi-account scheduler polling mobile and dsl accounts continuously
+
+    usage: o2_scrap_daemon <config.json> [--once] [--debug]
+
+    config file format:
+    {
+        "workers": 2,
+        "jitter": 60,
+        "rate_limits": {"mobile": 4, "dsl": 10},
+        "output": "/var/lib/o2_scrap/results.jsonl",
+        "store": "/var/lib/o2_scrap/usage",
+        "metrics": "/var/lib/node_exporter/o2_scrap.prom",
+        "driver_limits": {"max_rss": 1500000000, "max_age": 3600, "max_ops": 200},
+        "accounts": [
+            {"type": "mobile", "user": "...", "password": "...", "interval": 900, "options": {"headless": true}},
+            {"type": "dsl", "user": "...", "password_env": "O2_DSL_PASSWORD", "interval": 3600}
+        ]
+    }
+"""
+
+from __future__ import print_function
+import os
+import sys
+import json
+import time
+import heapq
+import signal
+import random
+import argparse
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from .o2_scrap import O2mobile, O2dsl, print_debug
+from .store import UsageStore
+from .models import DataUsage
+from .lifecycle import drivers, driver_config
+from .trace import tracer, PrometheusSink
+
+def usage_ratio(result):
+    """ highest data usage ratio (used/limit) of a poll result; 0 if unknown """
+    ratios = [0.0]
+    if 'overview' in result:
+        overview = result['overview']
+        if overview.get('limit'):
+            ratios.append(float(overview.get('used', 0)) / overview['limit'])
+    for overview in result.get('numbers', {}).values():
+        ratio = DataUsage.from_dict(overview.get('data-usage', {})).ratio
+        if ratio is not None:
+            ratios.append(ratio)
+    return max(ratios)
+
+class RateLimiter(object):
+    """ token bucket limiting the number of sessions per minute """
+
+    def __init__(self, per_minute):
+        self.interval = 60.0 / per_minute
+        self.lock = threading.Lock()
+        self.next_slot = 0.0
+
+    def acquire(self):
+        """ block until the next session may start """
+        with self.lock:
+            now = time.time()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+class Account(object):
+    """ account to be polled """
+
+    def __init__(self, config):
+        self.type = config.get('type', 'mobile')
+        self.user = config['user']
+        self.pwd = config.get('password') or os.environ.get(config.get('password_env', ''), '')
+        self.interval = config.get('interval', 900)
+        self.options = config.get('options', {})
+        self.next_run = 0.0
+        self.ratio = 0.0
+
+    def poll(self):
+        """ login, collect all data and logout
+
+            returns:
+                dictionary with the collected data
+        """
+        result = {'type': self.type, 'account': self.user, 'time': time.time()}
+        if self.type == 'dsl':
+            with O2dsl(self.user, self.pwd, **self.options) as o2d:
+                result['overview'] = o2d.get_overview()
+        else:
+            with O2mobile(self.user, self.pwd, **self.options) as o2m:
+                result['numbers'] = {}
+                for number in sorted(o2m.get_numbers()):
+                    result['numbers'][number] = o2m.get_overview(number)
+        return result
+
+class Scheduler(object):
+    """ polls accounts on a schedule with a bounded number of workers """
+
+    def __init__(self, accounts, workers=2, jitter=60, rate_limits=None, urgent_ratio=0.8, urgent_factor=0.5, sink=None, debug=False):
+        self.accounts = accounts
+        self.workers = workers
+        self.jitter = jitter
+        self.limiters = dict((portal, RateLimiter(rate)) for (portal, rate) in (rate_limits or {}).items())
+        self.urgent_ratio = urgent_ratio
+        self.urgent_factor = urgent_factor
+        self.sink = sink or (lambda result: print(json.dumps(result, sort_keys=True)))
+        self.debug = debug
+        self.stop_event = threading.Event()
+        self.lock = threading.Lock()
+        self.running = 0
+
+    def _priority(self, account):
+        """ heap key: accounts close to their data limit first, then by due time """
+        return (0 if account.ratio >= self.urgent_ratio else 1, account.next_run)
+
+    def _reschedule(self, account):
+        """ compute the next run of an account """
+        interval = account.interval
+        if account.ratio >= self.urgent_ratio:
+            interval *= self.urgent_factor
+        account.next_run = time.time() + interval + random.uniform(0, self.jitter)
+
+    def _poll(self, account):
+        """ poll a single account (runs in a worker thread) """
+        try:
+            if account.type in self.limiters:
+                self.limiters[account.type].acquire()
+            print_debug(self.debug, 'polling {0}:{1}'.format(account.type, account.user))
+            result = account.poll()
+            account.ratio = usage_ratio(result)
+            self.sink(result)
+        except BaseException as err: # pylint: disable=W0703
+            # do not let a single account kill the scheduler
+            print('polling {0}:{1} failed: {2}'.format(account.type, account.user, err), file=sys.stderr)
+        finally:
+            self._reschedule(account)
+            with self.lock:
+                self.running -= 1
+
+    def _requeue(self, pending, account, _future):
+        """ put an account back into the list of pending accounts """
+        with self.lock:
+            pending.append(account)
+
+    def stop(self, *_args):
+        """ stop scheduling new polls """
+        self.stop_event.set()
+
+    def run(self, once=False):
+        """ main loop
+
+            args:
+                once - poll every account a single time and return
+        """
+        for account in self.accounts:
+            account.next_run = time.time() + random.uniform(0, self.jitter if not once else 0)
+        pending = list(self.accounts)
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            while not self.stop_event.is_set():
+                now = time.time()
+                with self.lock:
+                    free = self.workers - self.running
+                    due = [account for account in pending if account.next_run <= now]
+                    queue = [(self._priority(account), cnt, account) for (cnt, account) in enumerate(due)]
+                    heapq.heapify(queue)
+                    started = [heapq.heappop(queue)[2] for _cnt in range(min(max(free, 0), len(queue)))]
+                    for account in started:
+                        pending.remove(account)
+                    self.running += len(started)
+                    finished = once and not pending and not self.running
+                for account in started:
+                    future = executor.submit(self._poll, account)
+                    if not once:
+                        future.add_done_callback(functools.partial(self._requeue, pending, account))
+                if finished:
+                    break
+                self.stop_event.wait(1)
+        finally:
+            executor.shutdown(wait=True)
+
+def main():
+    """ console entry point """
+    aparser = argparse.ArgumentParser(description='poll o2 mobile and dsl accounts')
+    aparser.add_argument('config', help='json file containing scheduler settings and accounts')
+    aparser.add_argument('--once', action='store_true', help='poll every account once and exit')
+    aparser.add_argument('--debug', action='store_true', help='show debug messages')
+    args = aparser.parse_args()
+
+    with open(args.config, 'r') as fh_:
+        config = json.load(fh_)
+
+    output = None
+    lock = threading.Lock()
+    if config.get('output'):
+        output = open(config['output'], 'a')
+    store = UsageStore(config['store']) if config.get('store') else None
+    driver_config.update(config.get('driver_limits', {}))
+    metrics = tracer.add_sink(PrometheusSink(config['metrics'], gauges=drivers.gauges)) if config.get('metrics') else None
+
+    def sink(result):
+        """ write a result as json line and append it to the usage store """
+        if store:
+            store.append_result(result)
+        line = json.dumps(result, sort_keys=True)
+        with lock:
+            if output:
+                output.write(line + '\n')
+                output.flush()
+            else:
+                print(line)
+                sys.stdout.flush()
+
+    scheduler = Scheduler([Account(account) for account in config.get('accounts', [])], workers=config.get('workers', 2), jitter=config.get('jitter', 60), rate_limits=config.get('rate_limits'), urgent_ratio=config.get('urgent_ratio', 0.8), urgent_factor=config.get('urgent_factor', 0.5), sink=sink, debug=args.debug)
+    signal.signal(signal.SIGTERM, scheduler.stop)
+    signal.signal(signal.SIGINT, scheduler.stop)
+    try:
+        scheduler.run(once=args.once)
+    finally:
+        drivers.quit_all()
+        if metrics:
+            tracer.remove_sink(metrics)
+        if output:
+            output.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+""" append-only columnar time-series store for usage snapshots """
+
+from __future__ import print_function
+import os
+import re
+import mmap
+import time
+import array
+import bisect
+import threading
+from datetime import date, datetime
+from .models import DataUsage, DslUsage, UNKNOWN
+
+# all columns are stored as signed 64bit integers; UNKNOWN (-1) marks unknown values
+COLUMNS = ('time', 'used', 'limit', 'estimation')
+
+def _component(name):
+    """ file system safe series component """
+    return re.sub(r'[^A-Za-z0-9_.@+-]', '_', str(name))
+
+class Series(object):
+    """ memory-mapped read access to a single series """
+
+    def __init__(self, directory):
+        self.maps = []
+        self.columns = {}
+        length = None
+        for column in COLUMNS:
+            fname = os.path.join(directory, column + '.i64')
+            size = os.path.getsize(fname) if os.path.exists(fname) else 0
+            if size >= 8:
+                with open(fname, 'rb') as fh_:
+                    mapped = mmap.mmap(fh_.fileno(), 0, access=mmap.ACCESS_READ)
+                self.maps.append(mapped)
+                # a partially written value at the end is ignored
+                self.columns[column] = memoryview(mapped)[:size - size % 8].cast('q')
+            else:
+                self.columns[column] = memoryview(array.array('q'))
+            # an interrupted append may leave columns of different length
+            length = len(self.columns[column]) if length is None else min(length, len(self.columns[column]))
+        self.length = length or 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return self.length
+
+    def close(self):
+        """ release the memory maps """
+        for column in list(self.columns):
+            self.columns[column].release()
+        self.columns = {}
+        for mapped in self.maps:
+            mapped.close()
+        self.maps = []
+
+    def index(self, start=None, end=None):
+        """ index range of samples with start <= time < end """
+        times = self.columns['time'][:self.length]
+        first = bisect.bisect_left(times, start) if start is not None else 0
+        last = bisect.bisect_left(times, end) if end is not None else self.length
+        return (first, last)
+
+class UsageStore(object):
+    """ stores usage snapshots per number (mobile) or line (dsl) in columnar files """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.lock = threading.Lock()
+        self.last = {}
+
+    def _path(self, series):
+        """ directory of a series """
+        return os.path.join(self.directory, *[_component(part) for part in series.split('/')])
+
+    @staticmethod
+    def _repair(path):
+        """ truncate all columns of a series to their common length: an interrupted append may leave
+            columns of different length and every later sample would be misaligned
+
+            returns:
+                number of samples
+        """
+        sizes = {}
+        for column in COLUMNS:
+            fname = os.path.join(path, column + '.i64')
+            sizes[column] = os.path.getsize(fname) if os.path.exists(fname) else 0
+        length = min(sizes.values()) // 8
+        for column in COLUMNS:
+            if sizes[column] > length * 8:
+                with open(os.path.join(path, column + '.i64'), 'r+b') as fh_:
+                    fh_.truncate(length * 8)
+        return length
+
+    def append(self, series, timestamp, used, limit=UNKNOWN, estimation=UNKNOWN):
+        """ append a sample
+
+            args:
+                series     - name of the series (e.g. mobile/<account>/<number>)
+                timestamp  - unix timestamp of the sample
+                used       - used bytes
+                limit      - data limit in bytes
+                estimation - estimated usage at the end of the billing cycle in bytes
+
+            returns:
+                True - sample stored
+                False - sample is older than the last sample of the series and got dropped
+        """
+        path = self._path(series)
+        values = (int(timestamp), int(used), int(limit), int(estimation))
+        with self.lock:
+            if series not in self.last:
+                if not os.path.isdir(path):
+                    os.makedirs(path)
+                self._repair(path)
+                with Series(path) as existing:
+                    self.last[series] = existing.columns['time'][len(existing) - 1] if len(existing) else None
+            if self.last[series] is not None and values[0] < self.last[series]:
+                return False
+            try:
+                for (column, value) in zip(COLUMNS, values):
+                    with open(os.path.join(path, column + '.i64'), 'ab') as fh_:
+                        fh_.write(array.array('q', [value]).tobytes())
+            except BaseException:
+                # drop the incomplete row
+                self._repair(path)
+                raise
+            self.last[series] = values[0]
+        return True
+
+    def append_result(self, result):
+        """ append a poll result as written by the scheduler """
+        timestamp = result.get('time', time.time())
+        if 'overview' in result:
+            usage = DslUsage.from_dict(result['overview'])
+            self.append('dsl/{0}'.format(result['account']), timestamp, usage.used, usage.limit, usage.prognosed)
+        for (number, overview) in result.get('numbers', {}).items():
+            usage = DataUsage.from_dict(overview.get('data-usage', {}))
+            self.append('mobile/{0}/{1}'.format(result['account'], number), timestamp, usage.current, usage.limit, usage.estimation)
+
+    def series(self):
+        """ list of all series """
+        result = []
+        for (root, _dirs, files) in os.walk(self.directory):
+            if 'time.i64' in files:
+                result.append(os.path.relpath(root, self.directory).replace(os.sep, '/'))
+        return sorted(result)
+
+    def open(self, series):
+        """ memory-mapped access to a series (use as context manager) """
+        return Series(self._path(series))
+
+    def query(self, series, start=None, end=None):
+        """ samples with start <= time < end
+
+            returns:
+                list of (time, used, limit, estimation) tuples
+        """
+        with self.open(series) as data:
+            (first, last) = data.index(start, end)
+            columns = [data.columns[column][first:last].tolist() for column in COLUMNS]
+        return list(zip(*columns))
+
+    def downsample(self, series, step, start=None, end=None, func='max', column='used'):
+        """ aggregate a column into buckets of step seconds
+
+            args:
+                func - aggregation (max, min, avg, last)
+
+            returns:
+                list of (bucket start, value) tuples
+        """
+        result = []
+        with self.open(series) as data:
+            (first, last) = data.index(start, end)
+            times = data.columns['time']
+            values = data.columns[column]
+            bucket = None
+            acc = []
+            for idx in range(first, last):
+                current = times[idx] - times[idx] % step
+                if current != bucket and acc:
+                    result.append((bucket, self._aggregate(acc, func)))
+                    acc = []
+                bucket = current
+                if values[idx] != UNKNOWN:
+                    acc.append(values[idx])
+            if acc:
+                result.append((bucket, self._aggregate(acc, func)))
+        return result
+
+    def _aggregate(self, values, func):
+        """ aggregate a list of values """
+        if func == 'min':
+            return min(values)
+        if func == 'avg':
+            return sum(values) // len(values)
+        if func == 'last':
+            return values[-1]
+        return max(values)
+
+    def cycles(self, series, cycle_day=1, start=None, end=None):
+        """ aggregate a series per billing cycle
+
+            args:
+                cycle_day - day of month the billing cycle starts
+
+            returns:
+                list of dictionaries (start, samples, used, limit, estimation) per billing cycle
+        """
+        cycle_day = max(1, min(cycle_day, 28))
+        result = []
+        with self.open(series) as data:
+            (first, last) = data.index(start, end)
+            current = None
+            for idx in range(first, last):
+                day = datetime.fromtimestamp(data.columns['time'][idx]).date()
+                if day.day >= cycle_day:
+                    cycle = date(day.year, day.month, cycle_day)
+                elif day.month == 1:
+                    cycle = date(day.year - 1, 12, cycle_day)
+                else:
+                    cycle = date(day.year, day.month - 1, cycle_day)
+                if current is None or current['start'] != cycle:
+                    current = {'start': cycle, 'samples': 0, 'used': UNKNOWN, 'limit': UNKNOWN, 'estimation': UNKNOWN}
+                    result.append(current)
+                current['samples'] += 1
+                current['used'] = max(current['used'], data.columns['used'][idx])
+                for column in ('limit', 'estimation'):
+                    if data.columns[column][idx] != UNKNOWN:
+                        current[column] = data.columns[column][idx]
+        return result
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+""" per-phase timing and tracing with pluggable sinks """
+
+from __future__ import print_function
+import os
+import json
+import time
+import functools
+import threading
+
+class _NullSpan(object):
+    """ span used while tracing is disabled """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def set(self, **attrs):
+        """ ignore attributes """
+
+NULL_SPAN = _NullSpan()
+
+class Span(object):
+    """ a single timed phase """
+
+    def __init__(self, tracer, name, attrs):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+        self.start = None
+        self.parent = None
+
+    def __enter__(self):
+        stack = self.tracer.stack()
+        self.parent = stack[-1].name if stack else None
+        stack.append(self)
+        self.start = time.time()
+        return self
+
+    def __exit__(self, exc_type, exc_value, _traceback):
+        duration = time.time() - self.start
+        self.tracer.stack().pop()
+        record = {
+            'name': self.name,
+            'start': self.start,
+            'duration': duration,
+            'parent': self.parent,
+            'status': 'error' if exc_type else 'ok',
+        }
+        if exc_type:
+            record['error'] = '{0}: {1}'.format(exc_type.__name__, exc_value)
+        if self.attrs:
+            record['attrs'] = self.attrs
+        self.tracer.emit(record)
+        return False
+
+    def set(self, **attrs):
+        """ add attributes to the span """
+        self.attrs.update(attrs)
+
+class Tracer(object):
+    """ creates spans and hands finished spans over to the registered sinks """
+
+    def __init__(self):
+        self.sinks = []
+        self.local = threading.local()
+
+    def add_sink(self, sink):
+        """ register a sink (any callable taking a span record) """
+        self.sinks.append(sink)
+        return sink
+
+    def remove_sink(self, sink):
+        """ unregister a sink """
+        self.sinks.remove(sink)
+        if hasattr(sink, 'close'):
+            sink.close()
+
+    def emit(self, record):
+        """ hand a finished span over to all sinks """
+        for sink in self.sinks:
+            sink(record)
+
+    def span(self, name, **attrs):
+        """ create a span to be used as context manager (no-op in case no sink is registered) """
+        if not self.sinks:
+            return NULL_SPAN
+        return Span(self, name, attrs)
+
+    def stack(self):
+        """ stack of open spans of the current thread """
+        try:
+            return self.local.stack
+        except AttributeError:
+            self.local.stack = []
+            return self.local.stack
+
+tracer = Tracer()
+
+def traced(name):
+    """ decorator wrapping a function into a span """
+    def _decorator(func):
+        @functools.wraps(func)
+        def _wrapper(*args, **kwargs):
+            if not tracer.sinks:
+                return func(*args, **kwargs)
+            with Span(tracer, name, {}):
+                return func(*args, **kwargs)
+        return _wrapper
+    return _decorator
+
+class CallbackSink(object):
+    """ sink calling a function for every finished span """
+
+    def __init__(self, callback):
+        self.callback = callback
+
+    def __call__(self, record):
+        self.callback(record)
+
+class JsonLinesSink(object):
+    """ sink writing one json document per finished span """
+
+    def __init__(self, filename):
+        self.lock = threading.Lock()
+        self.fh_ = open(filename, 'a')
+
+    def __call__(self, record):
+        line = json.dumps(record, sort_keys=True)
+        with self.lock:
+            self.fh_.write(line + '\n')
+            self.fh_.flush()
+
+    def close(self):
+        """ close the output file """
+        with self.lock:
+            self.fh_.close()
+
+class PrometheusSink(object):
+    """ sink aggregating span durations into a textfile for the node-exporter textfile collector
+
+        args:
+            filename - textfile to be written
+            interval - minimal time (in seconds) between two writes
+            prefix   - prefix of the metric names
+            gauges   - optional function returning additional gauges as {name: value} (e.g. drivers.gauges)
+    """
+
+    def __init__(self, filename, interval=10, prefix='o2_scrap', gauges=None):
+        self.filename = filename
+        self.interval = interval
+        self.prefix = prefix
+        self.gauges = gauges
+        self.lock = threading.Lock()
+        self.data = {}
+        self.written = 0
+
+    def __call__(self, record):
+        with self.lock:
+            entry = self.data.setdefault(record['name'], {'count': 0, 'errors': 0, 'sum': 0.0})
+            entry['count'] += 1
+            entry['sum'] += record['duration']
+            if record['status'] != 'ok':
+                entry['errors'] += 1
+        if time.time() - self.written >= self.interval:
+            self.flush()
+
+    def flush(self):
+        """ write all metrics to the textfile """
+        with self.lock:
+            lines = [
+                '# HELP {0}_span_seconds_total time spent per phase'.format(self.prefix),
+                '# TYPE {0}_span_seconds_total counter'.format(self.prefix),
+            ]
+            lines.extend('{0}_span_seconds_total{{span="{1}"}} {2:.6f}'.format(self.prefix, name, entry['sum']) for (name, entry) in sorted(self.data.items()))
+            lines.append('# HELP {0}_span_count_total number of executions per phase'.format(self.prefix))
+            lines.append('# TYPE {0}_span_count_total counter'.format(self.prefix))
+            lines.extend('{0}_span_count_total{{span="{1}"}} {2}'.format(self.prefix, name, entry['count']) for (name, entry) in sorted(self.data.items()))
+            lines.append('# HELP {0}_span_errors_total number of failed executions per phase'.format(self.prefix))
+            lines.append('# TYPE {0}_span_errors_total counter'.format(self.prefix))
+            lines.extend('{0}_span_errors_total{{span="{1}"}} {2}'.format(self.prefix, name, entry['errors']) for (name, entry) in sorted(self.data.items()))
+            if self.gauges:
+                for (name, value) in sorted(self.gauges().items()):
+                    lines.append('# TYPE {0}_{1} {2}'.format(self.prefix, name, 'counter' if name.endswith('_total') else 'gauge'))
+                    lines.append('{0}_{1} {2}'.format(self.prefix, name, value))
+            self.written = time.time()
+            # write atomically as the collector may read the file at any time
+            with open(self.filename + '.tmp', 'w') as fh_:
+                fh_.write('\n'.join(lines) + '\n')
+            os.rename(self.filename + '.tmp', self.filename)
+
+    def close(self):
+        """ write final state """
+        self.flush()
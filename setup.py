@@ -14,7 +14,8 @@ setup(name='o2_scrap',
         'selenium',
         'bs4',
         'six',
-        'lxml'
+        'lxml',
+        'requests'
     ],
     classifiers = [
         'Programming Language :: Python',
@@ -25,4 +26,10 @@ setup(name='o2_scrap',
         'Operating System :: OS Independent',
         'Topic :: Software Development :: Libraries :: Python Modules'
     ],
+    entry_points={
+        'console_scripts': [
+            'o2_scrap=o2_scrap.export:main',
+            'o2_scrap_daemon=o2_scrap.scheduler:main',
+        ],
+    },
     zip_safe=False)